@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Deque, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+
+from pse2.analytics.rows import Row, flatten, rebuild
+from pse2.analytics.store import FORMATS, SaveMeta, guess_format, open_store
+from pse2.core_es3.io import ES3Backend
+from pse2.core_es3.limits import LoadLimitError, LoadLimits
+from pse2.games.registry import detect_plugin, get_plugin_by_id
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# Result of exporting one file: (meta, rows) on success, (None, error) on failure.
+_ExportResult = Tuple[SaveMeta | None, List[Row] | str]
+
+
+def _parallel_map(fn: Callable[[T], R], items: Iterable[T], jobs: int) -> Iterator[R]:
+    """Ordered ``map`` across worker processes with a bounded number of tasks in flight.
+
+    Keeping the window small means results (and the inputs read for them) are
+    never all held in memory at once. Runs inline for a single job.
+    """
+    if jobs <= 1:
+        yield from map(fn, items)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending: Deque[Future] = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= jobs * 4:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _collect(inputs: Iterable[str], pattern: str) -> List[Path]:
+    files: List[Path] = []
+    for item in inputs:
+        path = Path(item)
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob(pattern) if p.is_file()))
+        else:
+            files.append(path)
+    return files
+
+
+def _export_one(task: Tuple[str, str, LoadLimits | None]) -> _ExportResult:
+    source, plugin_id, limits = task
+    path = Path(source)
+    try:
+        plugin = detect_plugin(path) if plugin_id == "auto" else get_plugin_by_id(plugin_id)
+        if plugin is None:
+            return None, f"{source}: no game plugin can decrypt this file"
+        backend = ES3Backend(key=plugin.get_es3_key(), validate=False, limits=limits)
+        tree = backend.load_from_file(path)
+        st = path.stat()
+    except LoadLimitError as exc:
+        m = exc.metrics
+        return None, f"{source}: {exc} after {m.elapsed:.2f}s, {m.decoded_bytes} bytes decoded"
+    except Exception as exc:
+        return None, f"{source}: {exc}"
+
+    meta = SaveMeta(
+        save_id=source,
+        source=str(path.resolve()),
+        plugin=plugin.id,
+        salt=backend.salt,
+        size=st.st_size,
+        mtime=st.st_mtime,
+        compressed=backend.compressed,
+    )
+    return meta, list(flatten(tree))
+
+
+def _import_one(task: Tuple[SaveMeta, List[Row], str]) -> str | None:
+    meta, rows, out_dir = task
+    try:
+        path = _import_target(Path(out_dir), meta.save_id)
+        backend = ES3Backend(key=get_plugin_by_id(meta.plugin).get_es3_key())
+        backend.prepare_new(meta.salt, compressed=meta.compressed)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        backend.save_to_file(path, rebuild(rows))
+    except Exception as exc:
+        return f"{meta.save_id}: {exc}"
+    return None
+
+
+def _import_target(out_dir: Path, save_id: str) -> Path:
+    """Mirror the source layout of ``save_id`` under ``out_dir``.
+
+    Absolute ids lose their drive/root and ``..``/``.`` parts are dropped, so
+    a target can never land outside ``out_dir`` (e.g. on the original saves).
+    """
+    source = Path(save_id)
+    parts = [p for p in source.parts[1 if source.anchor else 0:] if p not in ("..", ".")]
+    if not parts:
+        raise ValueError(f"save id does not name a file: {save_id!r}")
+    target = out_dir.joinpath(*parts)
+    root = out_dir.resolve()
+    if not target.resolve().is_relative_to(root) or target.resolve() == root:
+        raise ValueError(f"save id escapes the output directory: {save_id!r}")
+    return target
+
+
+def run_export(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="pse2 export",
+        description="Flatten ES3 saves into one row per value (SQLite or Parquet) for offline analysis.",
+    )
+    parser.add_argument("inputs", nargs="+", help="Save files, or directories to search.")
+    parser.add_argument("--out", required=True, help="Output .sqlite/.db file or Parquet directory.")
+    parser.add_argument("--format", choices=FORMATS, help="Output format (default: from --out suffix).")
+    parser.add_argument("--plugin", default="auto", help="Game plugin id, or 'auto' to detect per file (default).")
+    parser.add_argument("--glob", default="*.txt", help="File pattern inside directories (default: *.txt).")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count).")
+    parser.add_argument(
+        "--safe",
+        action="store_true",
+        help="Load under resource limits and skip saves that exceed them (for untrusted uploads).",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=LoadLimits.timeout,
+        help=f"Seconds allowed per save with --safe (default: {LoadLimits.timeout}).",
+    )
+    args = parser.parse_args(argv)
+    try:
+        fmt = args.format or guess_format(Path(args.out))
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    files = _collect(args.inputs, args.glob)
+    limits = LoadLimits(timeout=args.timeout) if args.safe else None
+    tasks = [(str(f), args.plugin, limits) for f in files]
+
+    start = time.perf_counter()
+    saves = nodes = 0
+    errors: List[str] = []
+    with open_store(Path(args.out), fmt, mode="w") as store:
+        for meta, result in _parallel_map(_export_one, tasks, args.jobs):
+            if meta is None:
+                errors.append(result)
+                continue
+            store.write(meta, result)
+            saves += 1
+            nodes += len(result)
+
+    elapsed = time.perf_counter() - start
+    print(f"Exported {saves} saves ({nodes} rows) to {args.out} in {elapsed:.2f}s")
+    for error in errors:
+        print(f"  skipped {error}")
+    if errors:
+        raise SystemExit(1)
+
+
+def run_import(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="pse2 import",
+        description="Rebuild ES3 save files from a 'pse2 export' database.",
+    )
+    parser.add_argument("source", help="Exported .sqlite/.db file or Parquet directory.")
+    parser.add_argument("--out", required=True, help="Directory to write the rebuilt saves into.")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the suffix).")
+    parser.add_argument("--save-id", action="append", help="Only rebuild this save (repeatable).")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Worker processes (default: CPU count).")
+    args = parser.parse_args(argv)
+    try:
+        fmt = args.format or guess_format(Path(args.source))
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    out_dir = Path(args.out)
+    start = time.perf_counter()
+    with open_store(Path(args.source), fmt, mode="r") as store:
+        metas = store.saves()
+        if args.save_id:
+            wanted = set(args.save_id)
+            metas = [m for m in metas if m.save_id in wanted]
+        tasks = ((m, store.rows(m.save_id), str(out_dir)) for m in metas)
+        errors = [e for e in _parallel_map(_import_one, tasks, args.jobs) if e]
+
+    elapsed = time.perf_counter() - start
+    print(f"Rebuilt {len(metas) - len(errors)} saves into {out_dir} in {elapsed:.2f}s")
+    for error in errors:
+        print(f"  failed {error}")
+    if errors:
+        raise SystemExit(1)
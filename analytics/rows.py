@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Tuple
+
+from pse2.core_es3.validate import kind_of
+
+_INT64_MIN = -(2**63)
+_INT64_MAX = 2**63 - 1
+
+
+@dataclass
+class Row:
+    """One node of a save tree.
+
+    ``path`` is a JSON Pointer ("" is the root, "/PlayersMoney" a top-level key).
+    ES3 ``{"__type": T, "value": v}`` wrappers collapse into a single row with
+    ``es3_type=T`` and ``wrapped=True`` so analytics see the value directly.
+    Containers have ``value=None`` and their children follow in ``seq`` order.
+    """
+
+    seq: int
+    path: str
+    es3_type: str | None
+    kind: str
+    wrapped: bool
+    value: Any
+
+
+def escape_key(key: str) -> str:
+    return key.replace("~", "~0").replace("/", "~1")
+
+
+def unescape_key(token: str) -> str:
+    return token.replace("~1", "/").replace("~0", "~")
+
+
+def _is_wrapper(node: Any) -> bool:
+    return (
+        isinstance(node, dict)
+        and len(node) == 2
+        and list(node) == ["__type", "value"]
+        and isinstance(node["__type"], str)
+    )
+
+
+def _scalar(kind: str, value: Any) -> Any:
+    # SQLite integers are 64-bit; larger ones are kept as text and restored by kind.
+    if kind == "int" and not _INT64_MIN <= value <= _INT64_MAX:
+        return str(value)
+    return value
+
+
+def flatten(tree: Any) -> Iterator[Row]:
+    """Walk ``tree`` depth first, yielding one :class:`Row` per node."""
+    seq = 0
+    stack: List[Tuple[str, Any]] = [("", tree)]
+    while stack:
+        path, node = stack.pop()
+
+        es3_type = None
+        wrapped = False
+        if _is_wrapper(node):
+            es3_type, node, wrapped = node["__type"], node["value"], True
+        elif isinstance(node, dict) and next(iter(node), None) == "__type":
+            if isinstance(node["__type"], str):
+                es3_type = node["__type"]
+
+        kind = kind_of(node)
+        if kind == "dict":
+            yield Row(seq, path, es3_type, kind, wrapped, None)
+            children = [
+                (f"{path}/{escape_key(k)}", v)
+                for k, v in node.items()
+                if not (k == "__type" and not wrapped and es3_type is not None)
+            ]
+            stack.extend(reversed(children))
+        elif kind == "list":
+            yield Row(seq, path, es3_type, kind, wrapped, None)
+            stack.extend(reversed([(f"{path}/{i}", v) for i, v in enumerate(node)]))
+        else:
+            yield Row(seq, path, es3_type, kind, wrapped, _scalar(kind, node))
+        seq += 1
+
+
+def _restore_scalar(kind: str, value: Any) -> Any:
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    if kind == "bool":
+        return bool(value)
+    if kind == "null":
+        return None
+    return value
+
+
+def rebuild(rows: List[Row]) -> Any:
+    """Inverse of :func:`flatten`; ``rows`` must be in ``seq`` order."""
+    containers: Dict[str, Any] = {}
+    root: Any = None
+
+    for row in rows:
+        if row.kind == "dict":
+            inner: Any = {}
+            if row.es3_type is not None and not row.wrapped:
+                inner["__type"] = row.es3_type
+            containers[row.path] = inner
+        elif row.kind == "list":
+            inner = []
+            containers[row.path] = inner
+        else:
+            inner = _restore_scalar(row.kind, row.value)
+
+        node = {"__type": row.es3_type, "value": inner} if row.wrapped else inner
+
+        if row.path == "":
+            root = node
+            continue
+        parent_path, _, token = row.path.rpartition("/")
+        parent = containers[parent_path]
+        if isinstance(parent, list):
+            parent.append(node)
+        else:
+            parent[unescape_key(token)] = node
+
+    return root
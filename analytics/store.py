@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+from dataclasses import astuple, dataclass
+from pathlib import Path
+from typing import Iterable, List
+
+from pse2.analytics.rows import Row
+
+FORMATS = ("sqlite", "parquet")
+
+
+@dataclass
+class SaveMeta:
+    save_id: str
+    source: str
+    plugin: str
+    # ES3 salt/IV of the source file; imported saves are re-encrypted with it.
+    salt: bytes
+    size: int
+    mtime: float
+    # Whether the source was gzipped inside the encryption; imports write it back the same way.
+    compressed: bool = False
+
+
+def guess_format(path: Path) -> str:
+    suffix = path.suffix.lower()
+    if suffix == ".arrow":
+        # ParquetStore writes a directory of Parquet files, not Arrow IPC.
+        raise ValueError(f"Arrow IPC files are not supported: {path} (use a .parquet path or a directory)")
+    return "parquet" if suffix in ("", ".parquet") else "sqlite"
+
+
+class SQLiteStore:
+    """Saves in two tables: ``saves`` (one row per file) and ``nodes`` (one row per tree node).
+
+    Indexes on ``nodes(path)`` and ``nodes(es3_type)`` are built once after the
+    bulk load, which is much faster than maintaining them per insert.
+    """
+
+    def __init__(self, path: Path, mode: str = "r"):
+        self.path = path
+        self.mode = mode
+        if mode == "r" and not path.is_file():
+            raise FileNotFoundError(f"Export database not found: {path}")
+        self.conn = sqlite3.connect(path)
+        if mode == "w":
+            self.conn.executescript(
+                """
+                PRAGMA journal_mode = MEMORY;
+                PRAGMA synchronous = OFF;
+                CREATE TABLE IF NOT EXISTS saves (
+                    save_id TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    plugin TEXT NOT NULL,
+                    salt BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    compressed INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE TABLE IF NOT EXISTS nodes (
+                    save_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    es3_type TEXT,
+                    kind TEXT NOT NULL,
+                    wrapped INTEGER NOT NULL,
+                    value,
+                    PRIMARY KEY (save_id, seq)
+                ) WITHOUT ROWID;
+                """
+            )
+            columns = {r[1] for r in self.conn.execute("PRAGMA table_info(saves)")}
+            if "compressed" not in columns:
+                # Exports written before the column existed are all uncompressed.
+                self.conn.execute("ALTER TABLE saves ADD COLUMN compressed INTEGER NOT NULL DEFAULT 0")
+
+    def write(self, meta: SaveMeta, rows: Iterable[Row]) -> None:
+        self.conn.execute("DELETE FROM nodes WHERE save_id = ?", (meta.save_id,))
+        self.conn.execute("INSERT OR REPLACE INTO saves VALUES (?, ?, ?, ?, ?, ?, ?)", astuple(meta))
+        self.conn.executemany(
+            "INSERT INTO nodes VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ((meta.save_id, *astuple(row)) for row in rows),
+        )
+
+    def saves(self) -> List[SaveMeta]:
+        cur = self.conn.execute("SELECT * FROM saves ORDER BY save_id")
+        return [SaveMeta(*r[:6], compressed=bool(r[6:] and r[6])) for r in cur]
+
+    def rows(self, save_id: str) -> List[Row]:
+        cur = self.conn.execute(
+            "SELECT seq, path, es3_type, kind, wrapped, value FROM nodes"
+            " WHERE save_id = ? ORDER BY seq",
+            (save_id,),
+        )
+        return [Row(seq, path, t, kind, bool(wrapped), value) for seq, path, t, kind, wrapped, value in cur]
+
+    def close(self) -> None:
+        if self.mode == "w":
+            self.conn.commit()
+            self.conn.executescript(
+                """
+                CREATE INDEX IF NOT EXISTS nodes_path ON nodes (path, save_id);
+                CREATE INDEX IF NOT EXISTS nodes_type ON nodes (es3_type);
+                """
+            )
+        self.conn.close()
+
+    def __enter__(self) -> "SQLiteStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class ParquetStore:
+    """Saves as a directory holding ``saves.parquet`` and ``nodes.parquet``.
+
+    Parquet has no secondary indexes; nodes are written sorted by save and
+    sequence so row-group statistics prune per-save reads. Scalar values are
+    stored as JSON text in the ``value`` column. Needs ``pyarrow``.
+    """
+
+    def __init__(self, path: Path, mode: str = "r"):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow") from None
+        self.pa, self.pq = pa, pq
+        self.path = path
+        self.mode = mode
+        self._writer = None
+        self._saves: List[SaveMeta] = []
+
+        self._node_schema = pa.schema(
+            [
+                ("save_id", pa.string()),
+                ("seq", pa.int64()),
+                ("path", pa.string()),
+                ("es3_type", pa.string()),
+                ("kind", pa.string()),
+                ("wrapped", pa.bool_()),
+                ("value", pa.string()),
+            ]
+        )
+        if mode == "w":
+            path.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(path / "nodes.parquet", self._node_schema)
+        elif not (path / "saves.parquet").is_file():
+            raise FileNotFoundError(f"Parquet export not found: {path}")
+
+    def write(self, meta: SaveMeta, rows: Iterable[Row]) -> None:
+        rows = list(rows)
+        columns = {
+            "save_id": [meta.save_id] * len(rows),
+            "seq": [r.seq for r in rows],
+            "path": [r.path for r in rows],
+            "es3_type": [r.es3_type for r in rows],
+            "kind": [r.kind for r in rows],
+            "wrapped": [r.wrapped for r in rows],
+            "value": [None if r.kind in ("dict", "list") else json.dumps(r.value) for r in rows],
+        }
+        self._writer.write_table(self.pa.table(columns, schema=self._node_schema))
+        self._saves.append(meta)
+
+    def saves(self) -> List[SaveMeta]:
+        table = self.pq.read_table(self.path / "saves.parquet")
+        return sorted((SaveMeta(**r) for r in table.to_pylist()), key=lambda m: m.save_id)
+
+    def rows(self, save_id: str) -> List[Row]:
+        table = self.pq.read_table(self.path / "nodes.parquet", filters=[("save_id", "=", save_id)])
+        out = [
+            Row(
+                r["seq"],
+                r["path"],
+                r["es3_type"],
+                r["kind"],
+                r["wrapped"],
+                None if r["value"] is None else json.loads(r["value"]),
+            )
+            for r in table.to_pylist()
+        ]
+        out.sort(key=lambda r: r.seq)
+        return out
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            self.pq.write_table(
+                self.pa.Table.from_pylist([vars(m) for m in self._saves]),
+                self.path / "saves.parquet",
+            )
+
+    def __enter__(self) -> "ParquetStore":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def open_store(path: Path, fmt: str | None = None, mode: str = "r") -> SQLiteStore | ParquetStore:
+    fmt = fmt or guess_format(path)
+    if fmt == "sqlite":
+        return SQLiteStore(path, mode)
+    if fmt == "parquet":
+        return ParquetStore(path, mode)
+    raise ValueError(f"Unknown export format '{fmt}' (expected one of {', '.join(FORMATS)})")
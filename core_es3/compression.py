@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+import zlib
+from typing import Iterable, Iterator
+
+from pse2.core_es3.crypto import CHUNK_SIZE
+
+# ES3 compresses saves with gzip before encrypting them.
+GZIP_MAGIC = b"\x1f\x8b"
+# gzip container around a raw deflate stream (zlib's wbits convention).
+_GZIP_WBITS = 31
+
+
+def is_compressed(plaintext: bytes | bytearray) -> bool:
+    return plaintext[:2] == GZIP_MAGIC
+
+
+def inflate(plaintext: bytes | bytearray) -> bytearray:
+    """Gunzip a whole decrypted save; raises ``zlib.error`` on broken data."""
+    return bytearray(zlib.decompress(plaintext, wbits=_GZIP_WBITS))
+
+
+class Inflater:
+    """Turns decrypted chunks into JSON text, gunzipping compressed saves on the fly.
+
+    Whether the save is compressed is decided by the first chunk; plain text
+    passes through untouched. Compressed input is inflated at most ``step``
+    bytes at a time, so callers can stop a decompression bomb between pieces.
+    """
+
+    def __init__(self, step: int = CHUNK_SIZE):
+        self.step = step
+        self.compressed: bool | None = None
+        self._inflate = None
+
+    def feed(self, chunk: bytes) -> Iterator[bytes]:
+        """Return the text in ``chunk``; ``compressed`` is set before this returns."""
+        if self.compressed is None:
+            self.compressed = is_compressed(chunk)
+            if self.compressed:
+                self._inflate = zlib.decompressobj(wbits=_GZIP_WBITS)
+        if not self.compressed:
+            return iter((chunk,))
+        return self._pieces(chunk)
+
+    def _pieces(self, chunk: bytes) -> Iterator[bytes]:
+        inflate = self._inflate
+        pending = chunk
+        while pending and not inflate.eof:
+            piece = inflate.decompress(pending, self.step)
+            pending = inflate.unconsumed_tail
+            if piece:
+                yield piece
+
+    def finish(self) -> Iterator[bytes]:
+        """Yield output still held by the decompressor; checks the stream is complete."""
+        if not self.compressed:
+            return
+        inflate = self._inflate
+        while not inflate.eof:
+            piece = inflate.decompress(b"", self.step)
+            if not piece:
+                raise zlib.error("Compressed save is truncated.")
+            yield piece
+
+
+def deflate_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """gzip ``chunks`` as they stream past (header mtime 0, so output is reproducible)."""
+    deflate = zlib.compressobj(wbits=_GZIP_WBITS)
+    for chunk in chunks:
+        out = deflate.compress(chunk)
+        if out:
+            yield out
+    yield deflate.flush()
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from typing import BinaryIO, Iterable, Iterator
+
+from Crypto.Cipher import AES
+from Crypto.Hash import SHA1
+from Crypto.Protocol.KDF import PBKDF2
+from Crypto.Util.Padding import pad
+
+# ES3 layout: 16 byte salt (also used as the CBC IV) followed by the ciphertext.
+SALT_SIZE = 16
+BLOCK_SIZE = AES.block_size
+KDF_ITERATIONS = 100
+# Cipher work is done in slices of this many bytes (a multiple of BLOCK_SIZE) so
+# buffers stay bounded no matter how large the save is.
+CHUNK_SIZE = 1 << 20
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_GZIP_DEFLATE = 8
+_GZIP_RESERVED_FLAGS = 0xE0
+_ALLOWED_CONTROL = frozenset(b"\t\n\r")
+_UTF8_BOM = b"\xef\xbb\xbf"
+
+
+def derive_key(password: str | bytes, salt: bytes) -> bytes:
+    return PBKDF2(password, salt, dkLen=16, count=KDF_ITERATIONS, hmac_hash_module=SHA1)
+
+
+def _cipher(password: str | bytes, salt: bytes):
+    return AES.new(derive_key(password, salt), AES.MODE_CBC, iv=salt)
+
+
+def _check_layout(data: memoryview) -> None:
+    if not has_es3_layout(len(data)):
+        raise ValueError("Data must be a salt followed by whole AES blocks")
+
+
+def _padding_length(last_block: bytes) -> int:
+    n = last_block[-1]
+    if not 1 <= n <= BLOCK_SIZE or last_block[-n:] != bytes([n]) * n:
+        raise ValueError("Padding is incorrect.")
+    return n
+
+
+def encrypt(plaintext: bytes, password: str | bytes, salt: bytes) -> bytes:
+    return salt + _cipher(password, salt).encrypt(pad(plaintext, BLOCK_SIZE))
+
+
+def encrypt_padded(padded: bytes | bytearray, password: str | bytes, salt: bytes) -> bytearray:
+    """Encrypt already padded plaintext in one pass into a preallocated buffer."""
+    out = bytearray(SALT_SIZE + len(padded))
+    out[:SALT_SIZE] = salt
+    with memoryview(out) as view:
+        _cipher(password, salt).encrypt(padded, output=view[SALT_SIZE:])
+    return out
+
+
+def decrypt_into(data: bytes | memoryview, password: str | bytes) -> bytearray:
+    """Decrypt ``data`` (e.g. a view over an mmap) into one preallocated buffer.
+
+    The ciphertext is read slice by slice straight from ``data``, so it is never
+    copied; only the plaintext buffer is allocated. Views are released before
+    returning or raising so the caller can close the mapping.
+    """
+    with memoryview(data) as view, view[SALT_SIZE:] as body:
+        _check_layout(view)
+        cipher = _cipher(password, bytes(view[:SALT_SIZE]))
+
+        out = bytearray(len(body))
+        with memoryview(out) as out_view:
+            for off in range(0, len(body), CHUNK_SIZE):
+                cipher.decrypt(body[off:off + CHUNK_SIZE], output=out_view[off:off + CHUNK_SIZE])
+
+    del out[-_padding_length(out[-BLOCK_SIZE:]):]
+    return out
+
+
+def iter_decrypt(data: bytes | memoryview, password: str | bytes) -> Iterator[bytes]:
+    """Yield the plaintext of ``data`` in chunks of at most CHUNK_SIZE bytes."""
+    with memoryview(data) as view, view[SALT_SIZE:] as body:
+        _check_layout(view)
+        cipher = _cipher(password, bytes(view[:SALT_SIZE]))
+
+        end = len(body)
+        for off in range(0, end, CHUNK_SIZE):
+            chunk = cipher.decrypt(body[off:off + CHUNK_SIZE])
+            if off + CHUNK_SIZE >= end:
+                chunk = chunk[:-_padding_length(chunk[-BLOCK_SIZE:])]
+            yield chunk
+
+
+def encrypt_stream(
+    out: BinaryIO,
+    chunks: Iterable[bytes],
+    password: str | bytes,
+    salt: bytes,
+) -> int:
+    """Encrypt plaintext ``chunks`` and write them to ``out`` as they arrive.
+
+    At most about CHUNK_SIZE bytes of plaintext are buffered. Returns the number
+    of bytes written.
+    """
+    cipher = _cipher(password, salt)
+    out.write(salt)
+    written = len(salt)
+
+    pending = bytearray()
+    for chunk in chunks:
+        pending += chunk
+        if len(pending) >= CHUNK_SIZE:
+            ready = len(pending) - len(pending) % BLOCK_SIZE
+            written += out.write(cipher.encrypt(memoryview(pending)[:ready]))
+            del pending[:ready]
+
+    written += out.write(cipher.encrypt(pad(bytes(pending), BLOCK_SIZE)))
+    return written
+
+
+def has_es3_layout(size: int) -> bool:
+    """Cheap structural check: salt plus a whole number of AES blocks."""
+    body = size - SALT_SIZE
+    return body >= BLOCK_SIZE and body % BLOCK_SIZE == 0
+
+
+def trial_decrypt_header(header: bytes, key: bytes) -> bool:
+    """Decrypt only the first cipher block and check it looks like ES3 plaintext.
+
+    ``key`` is the :func:`derive_key` result for the header's salt. ``header``
+    must hold at least the salt and one block; anything past that is ignored.
+    Plain saves start with a JSON object (optionally after a UTF-8 BOM),
+    compressed ones with the gzip magic number.
+    """
+    if len(header) < SALT_SIZE + BLOCK_SIZE:
+        return False
+    salt = header[:SALT_SIZE]
+    cipher = AES.new(key, AES.MODE_CBC, iv=salt)
+    block = cipher.decrypt(header[SALT_SIZE:SALT_SIZE + BLOCK_SIZE])
+
+    if block.startswith(_GZIP_MAGIC):
+        # Deflate is the only gzip method, and the top three flag bits are reserved.
+        return block[2] == _GZIP_DEFLATE and not block[3] & _GZIP_RESERVED_FLAGS
+    text = block[len(_UTF8_BOM):] if block.startswith(_UTF8_BOM) else block
+    if text.lstrip()[:1] != b"{":
+        return False
+    # In a one-block save the block ends in padding, which is not text.
+    n = text[-1]
+    if 1 <= n <= len(text) and text[-n:] == bytes([n]) * n:
+        text = text[:-n]
+    return all(b >= 0x20 or b in _ALLOWED_CONTROL for b in text)
+
+
+def trial_decrypt_tail(tail: bytes, key: bytes) -> bool:
+    """Decrypt only the last cipher block of a save and check its padding.
+
+    ``tail`` is the last two blocks of the file: the block before the final one
+    (the salt, for a one-block save) serves as its IV. ``key`` is derived as for
+    :func:`trial_decrypt_header`; a wrong key that slipped past that check fails
+    here like a full decrypt would.
+    """
+    if len(tail) != 2 * BLOCK_SIZE:
+        return False
+    cipher = AES.new(key, AES.MODE_CBC, iv=tail[:BLOCK_SIZE])
+    try:
+        _padding_length(cipher.decrypt(tail[BLOCK_SIZE:]))
+    except ValueError:
+        return False
+    return True
@@ -3,41 +3,259 @@ from __future__ import annotations
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, Tuple
+import hashlib
+import io
 import json
+import mmap
+import os
+import shutil
+import time
+import zlib
 
-from es3_modifier import ES3
+from es3_modifier import DecryptionException, InvalidDataException
+
+from pse2.core_es3.compression import deflate_chunks, inflate, is_compressed
+from pse2.core_es3.crypto import (
+    SALT_SIZE,
+    decrypt_into,
+    encrypt,
+    encrypt_padded,
+    encrypt_stream,
+    has_es3_layout,
+)
+from pse2.core_es3.limits import LoadLimitError, LoadLimits, LoadMetrics, finish_load, guarded_decrypt
+from pse2.core_es3.spans import SpanIndex, SpanIndexBuilder, iter_entries, parse_indexed, splice
+from pse2.core_es3.validate import SaveValidationError, ValidationReport, snapshot_kinds, verify_encoded
+
+
+def iter_json(payload: Any) -> Iterator[bytes]:
+    """Yield ``json.dumps(payload)`` as UTF-8, one top-level entry at a time.
+
+    Each entry still goes through the C encoder, but the whole document is never
+    held as one string.
+    """
+    if not isinstance(payload, dict):
+        yield json.dumps(payload, allow_nan=False).encode()
+        return
+    for chunk, _ in iter_entries(payload):
+        yield chunk
 
 
 @dataclass
 class ES3Backend:
     key: str
-    _original_data: bytes = field(default=b"", init=False)
+    # Check every encoded save against the intended tree before it is returned/written.
+    validate: bool = True
+    # Keep the decrypted text and top-level value spans so saves that pass
+    # ``changed`` re-encode only the values that changed instead of the whole tree.
+    incremental: bool = False
+    # With ``incremental``, also re-encode the values not listed in ``changed``
+    # to catch ones mutated in place; slower, for callers that cannot track edits.
+    verify_unlisted: bool = False
+    # Hardened loading for untrusted saves: decode under these limits and raise
+    # LoadLimitError as soon as one is exceeded.
+    limits: LoadLimits | None = None
+    last_validation: ValidationReport | None = field(default=None, init=False)
+    # Sizes and timing of the last load under ``limits``.
+    last_load_metrics: LoadMetrics | None = field(default=None, init=False)
+    _salt: bytes = field(default=b"", init=False)
+    # The loaded save was gzipped before encryption; saves are written the same way.
+    _compressed: bool = field(default=False, init=False)
+    _kinds: Any = field(default=None, init=False)
+    _spans: SpanIndex | None = field(default=None, init=False)
+    _pending_spans: SpanIndex | None = field(default=None, init=False)
 
-    def load_bytes(self, data: bytes) -> Dict[str, Any]:
-        
-        self._original_data = data
-        es3 = ES3(data, self.key)
-        return es3.load()
+    def _decode(self, data: bytes | memoryview) -> Dict[str, Any]:
+        start = time.perf_counter()
+        metrics = None
+        try:
+            if self.limits is None:
+                plaintext = decrypt_into(data, self.key)
+                compressed = is_compressed(plaintext)
+                if compressed:
+                    plaintext = inflate(plaintext)
+            else:
+                self.last_load_metrics = None
+                plaintext, metrics = guarded_decrypt(data, self.key, self.limits)
+                compressed = metrics.compressed
+        except ValueError as e:
+            raise DecryptionException(f"AES: {e} Wrong key?") from None
+        except zlib.error as e:
+            raise InvalidDataException(f"Compressed save could not be inflated: {e}") from None
+        try:
+            if self.incremental:
+                tree, self._spans = parse_indexed(plaintext)
+            else:
+                tree = json.loads(plaintext)
+        except ValueError:
+            raise InvalidDataException(
+                "Decrypted data was not in a valid ES3 format. Wrong key?"
+            ) from None
+
+        if metrics is not None:
+            finish_load(metrics, self.limits, start)
+            self.last_load_metrics = metrics
+        self._salt = bytes(data[:SALT_SIZE])
+        self._compressed = compressed
+        self._kinds = snapshot_kinds(tree) if self.validate else None
+        return tree
 
-    def save_bytes(self, payload: Dict[str, Any]) -> bytes:
-        if not self._original_data:
+    def _can_splice(self, payload: Dict[str, Any], changed: Iterable[str] | None) -> bool:
+        if changed is None or self._spans is None or not isinstance(payload, dict):
+            return False
+        # Added or removed keys change the layout; fall back to a full encode.
+        return payload.keys() == self._spans.spans.keys()
+
+    def _encode(
+        self,
+        out: BinaryIO,
+        payload: Dict[str, Any],
+        changed: Iterable[str] | None = None,
+    ) -> Tuple[ValidationReport, Dict[str, Any], Any]:
+        """Write the encrypted save to ``out``.
+
+        Returns the report plus the part of the payload (and its kind shadow)
+        that still needs a schema check: everything for a full encode, only the
+        changed keys for a spliced one.
+        """
+        if not self._salt:
             raise RuntimeError("No original data loaded before save.")
-        es3 = ES3(self._original_data, self.key)
-        raw_json = json.dumps(payload)
-        return es3.save(raw_json)
+        report = ValidationReport(digest="")
+        start = time.perf_counter()
+
+        try:
+            if self._can_splice(payload, changed):
+                changed = self._spans.changed_keys(payload, changed, self.verify_unlisted)
+                index = splice(self._spans, payload, changed)
+                with memoryview(index.plaintext) as view:
+                    report.digest = hashlib.sha256(view[:index.size]).hexdigest()
+                if self._compressed:
+                    with memoryview(index.plaintext) as view:
+                        packed = b"".join(deflate_chunks([view[:index.size]]))
+                    out.write(encrypt(packed, self.key, self._salt))
+                else:
+                    out.write(encrypt_padded(index.plaintext, self.key, self._salt))
+                report.incremental = True
+                self._pending_spans = index
+
+                scope = {k: payload[k] for k in changed}
+                kinds = self._kinds
+                shadow = {k: kinds.get(k) for k in changed} if isinstance(kinds, dict) else None
+            else:
+                hasher = hashlib.sha256()
+                builder = None
+                if self.incremental and isinstance(payload, dict):
+                    builder = SpanIndexBuilder(payload)
+                    source = builder.feed(iter_entries(payload))
+                else:
+                    source = iter_json(payload)
+
+                def chunks() -> Iterator[bytes]:
+                    for chunk in source:
+                        hasher.update(chunk)
+                        yield chunk
+
+                stream = deflate_chunks(chunks()) if self._compressed else chunks()
+                encrypt_stream(out, stream, self.key, self._salt)
+                report.digest = hasher.hexdigest()
+                self._pending_spans = builder.build() if builder is not None else None
+                scope, shadow = payload, self._kinds
+        except ValueError as exc:
+            # e.g. NaN or infinities, which JSON cannot hold: refuse the save.
+            report.problems.append(str(exc))
+            self.last_validation = report
+            raise SaveValidationError(report.problems, report) from None
+
+        report.timings["encode"] = time.perf_counter() - start
+        self.last_validation = report
+        return report, scope, shadow
+
+    def _commit(self) -> None:
+        # The text just written becomes the base for the next incremental save.
+        if self.incremental:
+            self._spans = self._pending_spans
+        self._pending_spans = None
+
+    @property
+    def salt(self) -> bytes:
+        return self._salt
+
+    @property
+    def compressed(self) -> bool:
+        return self._compressed
+
+    def prepare_new(self, salt: bytes | None = None, compressed: bool = False) -> None:
+        """Allow saving a tree that was not loaded through this backend."""
+        self._salt = salt or os.urandom(SALT_SIZE)
+        self._compressed = compressed
+        self._kinds = None
+        self._spans = None
+
+    def load_bytes(self, data: bytes) -> Dict[str, Any]:
+        return self._decode(data)
+
+    def save_bytes(self, payload: Dict[str, Any], changed: Iterable[str] | None = None) -> bytes:
+        """Encode ``payload``.
+
+        ``changed`` lists the top-level keys edited since the last load/save.
+        With ``incremental=True`` only changed values are re-encoded: the
+        listed keys plus any top-level entry replaced by a different object.
+        A value mutated in place must be listed, unless ``verify_unlisted``
+        is set.
+        """
+        buf = io.BytesIO()
+        report, scope, shadow = self._encode(buf, payload, changed)
+        data = buf.getvalue()
+        if self.validate:
+            verify_encoded(data, self.key, report.digest, scope, shadow, report)
+        self._commit()
+        return data
 
     def load_from_file(self, path: Path) -> Dict[str, Any]:
         if not path.is_file():
             raise FileNotFoundError(f"Save file not found: {path}")
-        data = path.read_bytes()
-        return self.load_bytes(data)
+        with path.open("rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if self.limits is not None and self.limits.max_input_bytes is not None:
+                # Reject oversized uploads before mapping or reading any of them.
+                if size > self.limits.max_input_bytes:
+                    metrics = LoadMetrics(input_bytes=size)
+                    raise LoadLimitError("max_input_bytes", size, self.limits.max_input_bytes, metrics)
+            if not has_es3_layout(size):
+                # Too short or misaligned to be a save; let the decoder report it.
+                return self.load_bytes(fh.read())
+            # Decrypt straight out of the page cache instead of copying the file.
+            with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                with memoryview(mapped) as view:
+                    return self._decode(view)
+
+    def save_to_file(
+        self,
+        path: Path,
+        payload: Dict[str, Any],
+        changed: Iterable[str] | None = None,
+    ) -> None:
+        # Stream to a sibling temp file and validate it there, so a rejected save
+        # leaves neither a stray backup nor a half-written file behind.
+        tmp_path = path.with_name(f"{path.name}.tmp-{os.getpid()}")
+        try:
+            with tmp_path.open("wb") as fh:
+                report, scope, shadow = self._encode(fh, payload, changed)
+
+            if self.validate:
+                with tmp_path.open("rb") as fh:
+                    with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        verify_encoded(mapped, self.key, report.digest, scope, shadow, report)
 
-    def save_to_file(self, path: Path, payload: Dict[str, Any]) -> None:
-        if path.exists():
-            backup_name = f"{path.name}.bak-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
-            backup_path = path.with_name(backup_name)
-            backup_path.write_bytes(path.read_bytes())
+            if path.exists():
+                backup_name = f"{path.name}.bak-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+                backup_path = path.with_name(backup_name)
+                shutil.copyfile(path, backup_path)
+                shutil.copymode(path, tmp_path)
 
-        data = self.save_bytes(payload)
-        path.write_bytes(data)
+            os.replace(tmp_path, path)
+            self._commit()
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
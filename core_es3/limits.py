@@ -0,0 +1,257 @@
+from __future__ import annotations
+
+import re
+import sys
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from itertools import accumulate
+from typing import Any, Dict, Tuple
+
+from pse2.core_es3.compression import Inflater
+from pse2.core_es3.crypto import iter_decrypt
+
+# A complete JSON string; unrolled so a failed match never backtracks more than once.
+_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.S)
+# The rest of a string body, up to its closing quote or a trailing backslash.
+_STRING_BODY = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*', re.S)
+# The longest prefix made of complete strings and non-string text. It stops
+# at the opening quote of a string that continues in the next chunk.
+_CLOSED_PREFIX = re.compile(rb'[^"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"]*)*', re.S)
+# Everything except the four bracket characters.
+_NON_BRACKETS = bytes(b for b in range(256) if b not in b"{}[]")
+# Everything except quotes, separators and brackets.
+_NON_STRUCTURE = bytes(b for b in range(256) if b not in b'",:{}[]')
+# A string in text reduced to _NON_STRUCTURE's complement.
+_REDUCED_STRING = re.compile(rb'"[^"]*"')
+# Possessive quantifiers (Python 3.11+) spare the regex engine from saving
+# backtracking state for every string it skips.
+_POSSESSIVE = b"+" if sys.version_info >= (3, 11) else b""
+
+
+@lru_cache(maxsize=64)
+def _skip_short(longest: int) -> re.Pattern:
+    """Match text and escape-free strings of at most ``longest`` bytes.
+
+    Stops at the opening quote of the first longer string.
+    """
+    p = _POSSESSIVE
+    return re.compile(rb'[^"]*%s(?:"[^"]{0,%d}%s"[^"]*%s)*%s' % (p, longest, p, p, p))
+
+
+@lru_cache(maxsize=64)
+def _long_run(longest: int) -> re.Pattern:
+    """Search for more than ``longest`` bytes between two quotes."""
+    return re.compile(rb'[^"]{%d}' % (longest + 1))
+_DEPTH_DELTA = [1 if b in b"{[" else -1 if b in b"}]" else 0 for b in range(256)]
+
+
+@dataclass
+class LoadLimits:
+    """Upper bounds for loading an untrusted save; ``None`` disables a check."""
+
+    # Size of the save file (salt + ciphertext).
+    max_input_bytes: int | None = 64 << 20
+    # Size of the JSON text after decryption and, for compressed saves, gunzip.
+    max_decoded_bytes: int | None = 256 << 20
+    # Nesting of objects/arrays; the top-level object is depth 1.
+    max_depth: int | None = 64
+    # Object members across the whole tree.
+    max_keys: int | None = 1_000_000
+    # Length of a single string (key or value), in encoded bytes.
+    max_string: int | None = 16 << 20
+    # Wall-clock seconds for the whole load.
+    timeout: float | None = 10.0
+
+
+@dataclass
+class LoadMetrics:
+    input_bytes: int = 0
+    decoded_bytes: int = 0
+    compressed: bool = False
+    depth: int = 0
+    keys: int = 0
+    longest_string: int = 0
+    elapsed: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class LoadLimitError(Exception):
+    """A load was stopped because the input exceeded one of its :class:`LoadLimits`.
+
+    ``limit`` names the field that was hit, ``actual`` is the value reached when
+    decoding stopped (a lower bound for the real one) and ``metrics`` holds
+    everything measured up to that point.
+    """
+
+    def __init__(self, limit: str, actual: float, allowed: float, metrics: LoadMetrics):
+        self.limit = limit
+        self.actual = actual
+        self.allowed = allowed
+        self.metrics = metrics
+        super().__init__(f"Save rejected: {limit} exceeded ({actual} > {allowed})")
+
+
+class _Guard:
+    def __init__(self, limits: LoadLimits, metrics: LoadMetrics):
+        self.limits = limits
+        self.metrics = metrics
+        self._start = time.perf_counter()
+        self._depth = 0
+        # Length so far of a string that continues past the last chunk, if any.
+        self._open: int | None = None
+        self._escaped = False
+
+    def check(self, limit: str, actual: float) -> None:
+        allowed = getattr(self.limits, limit)
+        if allowed is not None and actual > allowed:
+            self.tick()
+            raise LoadLimitError(limit, actual, allowed, self.metrics)
+
+    def tick(self) -> None:
+        self.metrics.elapsed = time.perf_counter() - self._start
+        timeout = self.limits.timeout
+        if timeout is not None and self.metrics.elapsed > timeout:
+            raise LoadLimitError("timeout", round(self.metrics.elapsed, 3), timeout, self.metrics)
+
+    def scan(self, text: bytes) -> None:
+        """Account for the next piece of JSON text.
+
+        Strings are measured and blanked out with regexes (or, in text without
+        escapes, byte-level passes), then keys and depth are read off what is
+        left, so the work per chunk stays in C. A string still open at the end
+        of a chunk is tracked by length only.
+        """
+        self.metrics.decoded_bytes += len(text)
+        self.check("max_decoded_bytes", self.metrics.decoded_bytes)
+
+        pos = 0
+        if self._open is not None:
+            pos = self._string_tail(text, 0)
+        if pos is not None:
+            if b"\\" in text:
+                end = _CLOSED_PREFIX.match(text, pos).end()
+            else:
+                # Without escapes every quote opens or closes a string.
+                end = text.rindex(b'"') if text.count(b'"', pos) % 2 else len(text)
+            self._structure(text[pos:end])
+            if end < len(text):
+                self._open, self._escaped = 0, False
+                self._string_tail(text, end + 1)
+        self.tick()
+
+    def _string_tail(self, text: bytes, pos: int) -> int | None:
+        """Consume the open string; return the offset after its closing quote, if any."""
+        if self._escaped:
+            if pos == len(text):
+                return None
+            pos += 1
+            self._open += 1
+            self._escaped = False
+        end = _STRING_BODY.match(text, pos).end()
+        self._open += end - pos
+        closed = end < len(text) and text[end] == 0x22
+        if end < len(text) and not closed:
+            # The chunk ends in the middle of an escape sequence.
+            self._escaped = True
+            self._open += 1
+        self.metrics.longest_string = max(self.metrics.longest_string, self._open)
+        self.check("max_string", self._open)
+        if not closed:
+            return None
+        self._open = None
+        return end + 1
+
+    def _structure(self, text: bytes) -> None:
+        metrics = self.metrics
+        if b"\\" in text:
+            strings = _STRING.findall(text)
+            if strings:
+                metrics.longest_string = max(metrics.longest_string, max(map(len, strings)) - 2)
+                self.check("max_string", metrics.longest_string)
+                text = _STRING.sub(b'""', text)
+            del strings
+        else:
+            # Without escapes every quote opens or closes a string, so strings
+            # are measured and dropped without creating an object per string.
+            self._longest_plain(text)
+            # In valid JSON a closing quote is never followed directly by
+            # another quote, so "" is always a string with nothing to count.
+            text = text.translate(None, _NON_STRUCTURE).replace(b'""', b"")
+            if b'"' in text:
+                text = _REDUCED_STRING.sub(b"", text)
+
+        metrics.keys += text.count(b":")
+        self.check("max_keys", metrics.keys)
+
+        brackets = text.translate(None, _NON_BRACKETS)
+        if brackets:
+            levels = list(accumulate(map(_DEPTH_DELTA.__getitem__, brackets), initial=self._depth))
+            self._depth = levels[-1]
+            metrics.depth = max(metrics.depth, max(levels))
+            self.check("max_depth", metrics.depth)
+
+    def _longest_plain(self, text: bytes) -> None:
+        """Update ``longest_string`` from escape-free text made of complete strings.
+
+        A regex skips every string no longer than the longest seen so far; only
+        a new record is measured in Python.
+        """
+        metrics = self.metrics
+        if not _long_run(metrics.longest_string).search(text):
+            return
+        pos = 0
+        while True:
+            pos = _skip_short(metrics.longest_string).match(text, pos).end()
+            if pos == len(text):
+                return
+            end = text.index(b'"', pos + 1)
+            metrics.longest_string = end - pos - 1
+            self.check("max_string", metrics.longest_string)
+            pos = end + 1
+
+
+def guarded_decrypt(
+    data: bytes | memoryview,
+    password: str | bytes,
+    limits: LoadLimits,
+) -> Tuple[bytearray, LoadMetrics]:
+    """Decrypt (and gunzip) a save while enforcing ``limits`` chunk by chunk.
+
+    Raises :class:`LoadLimitError` as soon as a limit is crossed, before the
+    rest of the input is touched. Decryption errors surface as ``ValueError``
+    like :func:`~pse2.core_es3.crypto.iter_decrypt`, broken compressed data as
+    ``zlib.error``. Returns the JSON text, which ``json.loads`` can then parse
+    without exceeding the limits.
+    """
+    metrics = LoadMetrics(input_bytes=len(data))
+    guard = _Guard(limits, metrics)
+    guard.check("max_input_bytes", metrics.input_bytes)
+
+    out = bytearray()
+    # Inflates in bounded steps so a gzip bomb is stopped within one step of the limit.
+    inflater = Inflater()
+    # Closed explicitly so an early raise never leaves a view on ``data`` (e.g. an mmap) open.
+    with closing(iter_decrypt(data, password)) as chunks:
+        for chunk in chunks:
+            pieces = inflater.feed(chunk)
+            # Known before any limit can trip, so a rejected gzip bomb reports it.
+            metrics.compressed = inflater.compressed
+            for piece in pieces:
+                guard.scan(piece)
+                out += piece
+            guard.tick()
+    for piece in inflater.finish():
+        guard.scan(piece)
+        out += piece
+    return out, metrics
+
+
+def finish_load(metrics: LoadMetrics, limits: LoadLimits, start: float) -> None:
+    """Record the total load time (including parsing) and apply the timeout to it."""
+    metrics.elapsed = time.perf_counter() - start
+    if limits.timeout is not None and metrics.elapsed > limits.timeout:
+        raise LoadLimitError("timeout", round(metrics.elapsed, 3), limits.timeout, metrics)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from json.decoder import WHITESPACE, JSONDecodeError, scanstring
+from typing import Any, Dict, Iterable, Iterator, List, Set, Tuple
+
+from pse2.core_es3.crypto import BLOCK_SIZE
+
+_decoder = json.JSONDecoder()
+_BOM = "\ufeff"
+
+# Rewritten values tracked lazily before the span table is rebuilt in one pass.
+_MAX_RESIZED = 256
+
+
+@dataclass
+class SpanIndex:
+    """Decrypted save text plus the byte span of every top-level value in it.
+
+    ``plaintext[:size]`` is the exact text that was last loaded or written;
+    anything past ``size`` is spare room (e.g. cipher padding).
+
+    ``spans`` holds offsets into the text the index was first built from.
+    Values rewritten since then are listed in ``resized`` with their current
+    length, and :meth:`locate` applies the resulting shifts on demand, so a
+    splice never has to touch the spans of keys it did not change.
+
+    ``values`` holds the top-level value objects the text was written from
+    (references, not copies), so entries replaced without being reported can
+    still be found (:meth:`changed_keys`).
+    """
+
+    plaintext: bytearray
+    size: int
+    spans: Dict[str, Tuple[int, int]]
+    # Top-level keys sorted by where their value starts in the text.
+    by_position: List[str]
+    values: Dict[str, Any]
+    resized: Dict[str, int] = field(default_factory=dict)
+
+    def changed_keys(
+        self,
+        payload: Dict[str, Any],
+        listed: Iterable[str],
+        verify_unlisted: bool = False,
+    ) -> Set[str]:
+        """Keys of ``payload`` whose text must be rewritten.
+
+        That is ``listed`` plus every key whose value is no longer the object
+        its text was written from. Values mutated in place are only caught with
+        ``verify_unlisted``, which re-encodes every other value and compares it
+        with its text. That costs about as much as a full encode, and values the
+        game formatted differently from ``json.dumps`` are rewritten as well.
+        """
+        changed = set(listed) & payload.keys()
+        values = self.values
+        for key, value in payload.items():
+            if value is not values.get(key):
+                changed.add(key)
+        if verify_unlisted:
+            for key in payload.keys() - changed:
+                start, end = self.locate(key)
+                if encode_value(key, payload[key]) != self.plaintext[start:end]:
+                    changed.add(key)
+        return changed
+
+    def locate(self, key: str) -> Tuple[int, int]:
+        start, end = self.spans[key]
+        shift = 0
+        for other, length in self.resized.items():
+            other_start, other_end = self.spans[other]
+            if other_start < start:
+                shift += length - (other_end - other_start)
+        length = self.resized.get(key, end - start)
+        return start + shift, start + shift + length
+
+    def compacted(self) -> "SpanIndex":
+        """Fold ``resized`` back into ``spans`` with one pass over the keys."""
+        spans: Dict[str, Tuple[int, int]] = {}
+        shift = 0
+        for key in self.by_position:
+            start, end = self.spans[key]
+            length = self.resized.get(key, end - start)
+            spans[key] = (start + shift, start + shift + length)
+            shift += length - (end - start)
+        return SpanIndex(self.plaintext, self.size, spans, self.by_position, self.values)
+
+
+def encode_value(key: str, value: Any) -> bytes:
+    """``json.dumps`` one top-level value; NaN and infinities are not valid JSON."""
+    try:
+        return json.dumps(value, allow_nan=False).encode()
+    except ValueError as exc:
+        raise ValueError(f"/{key}: {exc}") from None
+
+
+def iter_entries(payload: Dict[str, Any]) -> Iterator[Tuple[bytes, int]]:
+    """Yield ``json.dumps(payload)`` as UTF-8 pieces, one top-level entry each.
+
+    Every piece comes with the offset at which its value starts, so callers can
+    index the output while writing it. The closing brace has offset -1.
+    """
+    sep = b"{"
+    for key, value in payload.items():
+        head = sep + json.dumps(key).encode() + b": "
+        yield head + encode_value(key, value), len(head)
+        sep = b", "
+    yield (b"}" if payload else b"{}"), -1
+
+
+class SpanIndexBuilder:
+    """Collects :func:`iter_entries` output into a :class:`SpanIndex` as it streams past."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        self._payload = payload
+        self._keys = iter(payload)
+        self._buf = bytearray()
+        self._spans: Dict[str, Tuple[int, int]] = {}
+        self._order: List[str] = []
+
+    def feed(self, entries: Iterable[Tuple[bytes, int]]) -> Iterator[bytes]:
+        for chunk, value_at in entries:
+            if value_at >= 0:
+                key = next(self._keys)
+                start = len(self._buf) + value_at
+                self._spans[key] = (start, len(self._buf) + len(chunk))
+                self._order.append(key)
+            self._buf += chunk
+            yield chunk
+
+    def build(self) -> SpanIndex:
+        return SpanIndex(self._buf, len(self._buf), self._spans, self._order, dict(self._payload))
+
+
+def parse_indexed(plaintext: bytearray) -> Tuple[Dict[str, Any], SpanIndex]:
+    """``json.loads`` for a top-level object that also records value spans.
+
+    Values are still decoded by the C scanner; only the outer object is walked
+    here. Raises ``ValueError`` (JSONDecodeError) exactly where json.loads would.
+    """
+    text = plaintext.decode("utf-8")
+    ws = WHITESPACE.match
+    idx = 1 if text.startswith(_BOM) else 0
+    idx = ws(text, idx).end()
+    if text[idx:idx + 1] != "{":
+        raise JSONDecodeError("Expecting top-level object", text, idx)
+
+    tree: Dict[str, Any] = {}
+    char_spans: List[Tuple[str, int, int]] = []
+    idx = ws(text, idx + 1).end()
+    if text[idx:idx + 1] == "}":
+        idx += 1
+    else:
+        while True:
+            if text[idx:idx + 1] != '"':
+                raise JSONDecodeError("Expecting property name enclosed in double quotes", text, idx)
+            key, idx = scanstring(text, idx + 1)
+            idx = ws(text, idx).end()
+            if text[idx:idx + 1] != ":":
+                raise JSONDecodeError("Expecting ':' delimiter", text, idx)
+            idx = ws(text, idx + 1).end()
+            try:
+                value, end = _decoder.scan_once(text, idx)
+            except StopIteration as err:
+                raise JSONDecodeError("Expecting value", text, err.value) from None
+            tree[key] = value
+            char_spans.append((key, idx, end))
+            idx = ws(text, end).end()
+            if text[idx:idx + 1] == "}":
+                idx += 1
+                break
+            if text[idx:idx + 1] != ",":
+                raise JSONDecodeError("Expecting ',' delimiter", text, idx)
+            idx = ws(text, idx + 1).end()
+
+    if ws(text, idx).end() != len(text):
+        raise JSONDecodeError("Extra data", text, idx)
+
+    # Character offsets equal byte offsets for ASCII text; otherwise convert once.
+    spans: Dict[str, Tuple[int, int]] = {}
+    if text.isascii():
+        for key, start, end in char_spans:
+            spans[key] = (start, end)
+    else:
+        char_pos = byte_pos = 0
+        for key, start, end in char_spans:
+            byte_pos += len(text[char_pos:start].encode("utf-8"))
+            value_bytes = len(text[start:end].encode("utf-8"))
+            spans[key] = (byte_pos, byte_pos + value_bytes)
+            char_pos, byte_pos = end, byte_pos + value_bytes
+
+    by_position = sorted(spans, key=lambda k: spans[k][0])
+    return tree, SpanIndex(plaintext, len(plaintext), spans, by_position, dict(tree))
+
+
+def splice(index: SpanIndex, payload: Dict[str, Any], changed: Iterable[str]) -> SpanIndex:
+    """Re-encode only the ``changed`` top-level values into a new padded buffer.
+
+    Unchanged text is copied as-is. The returned index owns a buffer whose
+    length is a multiple of BLOCK_SIZE with PKCS#7 padding already in place,
+    ready to be encrypted in one pass.
+    """
+    src = memoryview(index.plaintext)[:index.size]
+    edits = sorted((index.locate(key), key) for key in set(changed))
+
+    pieces: List[Any] = []
+    resized = dict(index.resized)
+    cursor = 0
+    for (start, end), key in edits:
+        new = encode_value(key, payload[key])
+        pieces.append(src[cursor:start])
+        pieces.append(new)
+        resized[key] = len(new)
+        cursor = end
+    pieces.append(src[cursor:])
+
+    size = sum(len(p) for p in pieces)
+    pad = BLOCK_SIZE - size % BLOCK_SIZE
+    buf = bytearray(size + pad)
+    pos = 0
+    for piece in pieces:
+        buf[pos:pos + len(piece)] = piece
+        pos += len(piece)
+    buf[size:] = bytes([pad]) * pad
+    del pieces
+    src.release()
+
+    # Every key now matches the text, so the payload's current entries are the reference.
+    out = SpanIndex(buf, size, index.spans, index.by_position, dict(payload), resized)
+    return out.compacted() if len(resized) > _MAX_RESIZED else out
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import hashlib
+import time
+import zlib
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from pse2.core_es3.compression import Inflater
+from pse2.core_es3.crypto import iter_decrypt
+
+# Kinds of JSON values as they come out of json.loads.
+_KINDS = {
+    bool: "bool",
+    int: "int",
+    float: "float",
+    str: "string",
+    type(None): "null",
+    dict: "dict",
+    list: "list",
+}
+
+# ES3 primitive type names and the JSON kinds the game accepts for them.
+_DECLARED_KINDS = {
+    "int": ("int",),
+    "uint": ("int",),
+    "long": ("int",),
+    "ulong": ("int",),
+    "short": ("int",),
+    "ushort": ("int",),
+    "byte": ("int",),
+    "sbyte": ("int",),
+    "float": ("float", "int"),
+    "double": ("float", "int"),
+    "decimal": ("float", "int"),
+    "bool": ("bool",),
+    "string": ("string",),
+    "char": ("string",),
+}
+
+_MAX_REPORTED_PROBLEMS = 20
+
+
+class SaveValidationError(ValueError):
+    """The encoded save would not load back as the intended tree."""
+
+    def __init__(self, problems: List[str], report: "ValidationReport"):
+        self.problems = problems
+        self.report = report
+        shown = problems[:_MAX_REPORTED_PROBLEMS]
+        more = len(problems) - len(shown)
+        text = "\n".join(shown) + (f"\n... and {more} more" if more > 0 else "")
+        super().__init__(f"Save failed validation:\n{text}")
+
+
+@dataclass
+class ValidationReport:
+    digest: str
+    # Seconds spent per stage: encode (serialize + encrypt), verify_cipher, verify_schema.
+    timings: Dict[str, float] = field(default_factory=dict)
+    problems: List[str] = field(default_factory=list)
+    # True when only changed values were re-encoded (ES3Backend incremental mode).
+    incremental: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return not self.problems
+
+
+def kind_of(value: Any) -> str:
+    kind = _KINDS.get(type(value))
+    if kind is not None:
+        return kind
+    if isinstance(value, dict):
+        return "dict"
+    if isinstance(value, list):
+        return "list"
+    return _KINDS.get(type(value), type(value).__name__)
+
+
+def snapshot_kinds(tree: Any) -> Any:
+    """Shadow of ``tree`` holding the kind of each top-level entry.
+
+    Taken at load time so later edits, which mutate the tree in place, can be
+    checked against what the game originally wrote. Only the top level and the
+    ``value`` of ES3 ``__type`` wrappers are recorded; walking every leaf made
+    the snapshot cost more than the load itself.
+    """
+    if not isinstance(tree, dict):
+        return kind_of(tree)
+    shadow: Dict[str, Any] = {}
+    for key, value in tree.items():
+        if type(value) is dict and "__type" in value and "value" in value:
+            shadow[key] = {"value": kind_of(value["value"])}
+        else:
+            shadow[key] = kind_of(value)
+    return shadow
+
+
+def _compatible(original: str, new: str) -> bool:
+    if original == new or original == "null":
+        return True
+    # ES3 reads a JSON integer into a float field, but not the other way round.
+    return original == "float" and new == "int"
+
+
+def check_schema(tree: Any, shadow: Any, problems: List[str], path: str = "") -> None:
+    """Compare ``tree`` against a :func:`snapshot_kinds` shadow and ES3 ``__type`` tags."""
+    if isinstance(tree, dict):
+        declared = tree.get("__type")
+        if isinstance(declared, str) and "value" in tree:
+            allowed = _DECLARED_KINDS.get(declared)
+            actual = kind_of(tree["value"])
+            if allowed is not None and actual not in allowed:
+                problems.append(f"{path or '/'}: __type {declared} holds {actual}")
+
+        if isinstance(shadow, dict):
+            for key, value in tree.items():
+                sub = shadow.get(key)
+                if sub is None:
+                    continue
+                # Fast path for the common case: a leaf or list that kept its kind.
+                if isinstance(sub, str) and sub != "dict" and _KINDS.get(type(value)) == sub:
+                    continue
+                check_schema(value, sub, problems, f"{path}/{key}")
+            return
+    elif isinstance(tree, list):
+        if isinstance(shadow, list):
+            for i, (value, sub) in enumerate(zip(tree, shadow)):
+                check_schema(value, sub, problems, f"{path}/{i}")
+            return
+
+    if shadow is None:
+        return
+    expected = shadow if isinstance(shadow, str) else kind_of(shadow)
+    actual = kind_of(tree)
+    if not _compatible(expected, actual):
+        problems.append(f"{path or '/'}: was {expected}, now {actual}")
+
+
+def verify_encoded(
+    encoded: bytes | memoryview,
+    key: str,
+    digest: str,
+    payload: Dict[str, Any],
+    shadow: Any,
+    report: ValidationReport,
+) -> None:
+    """Decrypt ``encoded`` and check it against the serialization digest and schema.
+
+    The plaintext is hashed chunk by chunk rather than parsed again: ``digest``
+    was taken over the exact JSON text that was written (before gzip, for a
+    compressed save), so a match proves the file decrypts to the intended
+    tree. Raises :class:`SaveValidationError` on any problem.
+    """
+    start = time.perf_counter()
+    hasher = hashlib.sha256()
+    inflater = Inflater()
+    try:
+        for chunk in iter_decrypt(encoded, key):
+            for piece in inflater.feed(chunk):
+                hasher.update(piece)
+        for piece in inflater.finish():
+            hasher.update(piece)
+    except (ValueError, zlib.error) as exc:
+        report.problems.append(f"encoded save does not decrypt: {exc}")
+    else:
+        if hasher.hexdigest() != digest:
+            report.problems.append("decrypted save does not match the serialized tree")
+    report.timings["verify_cipher"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    check_schema(payload, shadow, report.problems)
+    report.timings["verify_schema"] = time.perf_counter() - start
+
+    if report.problems:
+        raise SaveValidationError(report.problems, report)
@@ -1,19 +1,156 @@
 from __future__ import annotations
 
-from typing import List
+import warnings
+from importlib.metadata import entry_points
+from pathlib import Path
+from typing import Dict, List, Tuple
 
-from pse2.games.base import GamePlugin
+from pse2.core_es3.crypto import (
+    SALT_SIZE,
+    BLOCK_SIZE,
+    derive_key,
+    has_es3_layout,
+    trial_decrypt_header,
+    trial_decrypt_tail,
+)
+from pse2.games.base import GamePlugin, SaveLocation
 from pse2.games.phasmophobia.plugin import PhasmophobiaPlugin
 
+# Third-party packages can ship extra games by declaring an entry point in this
+# group that points at a GamePlugin class (or instance).
+ENTRY_POINT_GROUP = "pse2.games"
+
+_BUILTIN_PLUGINS = (PhasmophobiaPlugin,)
+
+# (size, mtime_ns) of a file when it was last probed; a change invalidates the result.
+_FileStamp = Tuple[int, int]
+
+
+class PluginRegistry:
+    """Process-wide plugin index; use ``PluginRegistry.instance()``."""
+
+    _instance: "PluginRegistry | None" = None
+
+    def __init__(self) -> None:
+        self._plugins: Dict[str, GamePlugin] = {}
+        self._keys: Dict[str, bytes] = {}
+        self._locations: Dict[str, List[SaveLocation]] = {}
+        self._detected: Dict[Path, Tuple[_FileStamp, str | None]] = {}
+        self._discovered = False
+
+    @classmethod
+    def instance(cls) -> "PluginRegistry":
+        if cls._instance is None:
+            cls._instance = cls()
+        return cls._instance
+
+    # ---------- Registration ----------
+
+    def register(self, plugin: GamePlugin) -> None:
+        if plugin.id in self._plugins:
+            raise ValueError(f"Plugin id '{plugin.id}' is already registered")
+        self._plugins[plugin.id] = plugin
+        self._keys[plugin.id] = plugin.get_es3_key().encode("utf-8")
+        self._detected.clear()
+
+    def _discover(self) -> None:
+        if self._discovered:
+            return
+        self._discovered = True
+
+        for plugin_cls in _BUILTIN_PLUGINS:
+            self.register(plugin_cls())
+
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            try:
+                obj = ep.load()
+                plugin = obj() if isinstance(obj, type) else obj
+                self.register(plugin)
+            except Exception as exc:
+                warnings.warn(f"Skipping game plugin '{ep.name}': {exc}", RuntimeWarning)
+
+    # ---------- Lookup ----------
+
+    def all(self) -> List[GamePlugin]:
+        self._discover()
+        return list(self._plugins.values())
+
+    def get(self, plugin_id: str) -> GamePlugin:
+        self._discover()
+        try:
+            return self._plugins[plugin_id]
+        except KeyError:
+            raise KeyError(f"No plugin with id '{plugin_id}'") from None
+
+    def default_locations(self, plugin_id: str) -> List[SaveLocation]:
+        locations = self._locations.get(plugin_id)
+        if locations is None:
+            locations = self.get(plugin_id).get_default_locations()
+            self._locations[plugin_id] = locations
+        return locations
+
+    # ---------- Detection ----------
+
+    def detect(self, path: Path) -> GamePlugin | None:
+        """Return the plugin whose ES3 key decrypts ``path``, or None.
+
+        Only the first and last cipher blocks are read and decrypted: a key
+        must produce a plausible header *and* valid padding, otherwise the next
+        plugin is tried. The answer is cached per path until the file's size or
+        mtime changes.
+        """
+        self._discover()
+        path = Path(path).resolve()
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        stamp = (st.st_size, st.st_mtime_ns)
+
+        cached = self._detected.get(path)
+        if cached is not None and cached[0] == stamp:
+            plugin_id = cached[1]
+            return self._plugins[plugin_id] if plugin_id is not None else None
+
+        plugin_id = None
+        if has_es3_layout(st.st_size):
+            with path.open("rb") as fh:
+                header = fh.read(SALT_SIZE + BLOCK_SIZE)
+                fh.seek(st.st_size - 2 * BLOCK_SIZE)
+                tail = fh.read(2 * BLOCK_SIZE)
+            salt = header[:SALT_SIZE]
+            for candidate in self._candidates(path):
+                # PBKDF2 dominates a probe; run it once per candidate.
+                key = derive_key(self._keys[candidate], salt)
+                if trial_decrypt_header(header, key) and trial_decrypt_tail(tail, key):
+                    plugin_id = candidate
+                    break
+
+        self._detected[path] = (stamp, plugin_id)
+        return self._plugins[plugin_id] if plugin_id is not None else None
+
+    def _candidates(self, path: Path) -> List[str]:
+        # Plugins that list this file as a default location are tried first.
+        preferred = []
+        for plugin_id in self._plugins:
+            for loc in self.default_locations(plugin_id):
+                if loc.path.name == path.name:
+                    preferred.append(plugin_id)
+                    break
+        return preferred + [pid for pid in self._plugins if pid not in preferred]
+
+
+def get_registry() -> PluginRegistry:
+    return PluginRegistry.instance()
+
 
 def get_all_plugins() -> List[GamePlugin]:
-    return [
-        PhasmophobiaPlugin(),
-    ]
+    return get_registry().all()
 
 
 def get_plugin_by_id(plugin_id: str) -> GamePlugin:
-    for plugin in get_all_plugins():
-        if plugin.id == plugin_id:
-            return plugin
-    raise KeyError(f"No plugin with id '{plugin_id}'")
+    return get_registry().get(plugin_id)
+
+
+def detect_plugin(path: Path) -> GamePlugin | None:
+    return get_registry().detect(path)
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import gzip
+import json
+import random
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from pse2.core_es3.crypto import SALT_SIZE, encrypt
+
+# A few code points from outside Latin-1 so non-ASCII escaping gets exercised.
+_UNICODE_POOL = "żółćęśąńŁ€ñüßøÆ漢字かなカナ한글Ωπ∑√≈🙂👻🔦"
+_ASCII_POOL = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_ -.:/\\\"'"
+
+
+@dataclass
+class CorpusConfig:
+    max_keys: int = 30
+    max_depth: int = 4
+    max_children: int = 6
+    max_string: int = 24
+    unicode: bool = True
+    big_numbers: bool = True
+    # Chance that a value is written as an ES3 {"__type": ..., "value": ...} wrapper.
+    wrap_ratio: float = 0.6
+    # Chance to include the Phasmophobia keys the plugin models (PlayersMoney / Experience).
+    player_keys_ratio: float = 0.7
+
+
+class SaveGenerator:
+    """Deterministic generator of synthetic ES3 save trees for a given seed."""
+
+    def __init__(self, seed: int, config: CorpusConfig | None = None):
+        self.seed = seed
+        self.config = config or CorpusConfig()
+        self.rng = random.Random(seed)
+
+    # ---------- Scalars ----------
+
+    def _int(self) -> int:
+        rng = self.rng
+        if self.config.big_numbers and rng.random() < 0.2:
+            return rng.choice([2**31 - 1, -(2**31), 2**63 - 1, -(2**63), 10**30, rng.getrandbits(80)])
+        return rng.randint(-100000, 100000)
+
+    def _float(self) -> float:
+        rng = self.rng
+        if self.config.big_numbers and rng.random() < 0.2:
+            return rng.choice([1e308, -1e-308, 5e-324, 3.4028235e38, -0.0, rng.uniform(-1e18, 1e18)])
+        return rng.uniform(-1000.0, 1000.0)
+
+    def _string(self) -> str:
+        rng = self.rng
+        pool = _ASCII_POOL + (_UNICODE_POOL if self.config.unicode else "")
+        return "".join(rng.choice(pool) for _ in range(rng.randint(0, self.config.max_string)))
+
+    def _key(self, taken: Dict[str, Any]) -> str:
+        key = self._string() or "k"
+        while key in taken or key == "__type":
+            key = f"{key}_{len(taken)}"
+        return key
+
+    # ---------- Values ----------
+
+    def _wrapped(self, depth: int) -> Dict[str, Any]:
+        rng = self.rng
+        choices: List[Callable[[], Dict[str, Any]]] = [
+            lambda: {"__type": "int", "value": self._int()},
+            lambda: {"__type": "float", "value": self._float()},
+            lambda: {"__type": "bool", "value": rng.random() < 0.5},
+            lambda: {"__type": "string", "value": self._string()},
+            lambda: {
+                "__type": "UnityEngine.Color",
+                "value": {c: rng.random() for c in "rgba"},
+            },
+        ]
+        if depth > 0:
+            choices += [
+                lambda: {
+                    "__type": "System.Collections.Generic.List`1[[System.Int32, mscorlib]],mscorlib",
+                    "value": [self._int() for _ in range(rng.randint(0, self.config.max_children))],
+                },
+                lambda: {
+                    "__type": "System.Collections.Generic.Dictionary`2[[System.String, mscorlib],"
+                              "[System.Object, mscorlib]],mscorlib",
+                    "value": self._object(depth - 1),
+                },
+            ]
+        return rng.choice(choices)()
+
+    def _plain(self, depth: int) -> Any:
+        rng = self.rng
+        choices: List[Callable[[], Any]] = [
+            self._int,
+            self._float,
+            lambda: rng.random() < 0.5,
+            self._string,
+            lambda: None,
+        ]
+        if depth > 0:
+            choices += [
+                lambda: [self.value(depth - 1) for _ in range(rng.randint(0, self.config.max_children))],
+                lambda: self._object(depth - 1),
+            ]
+        return rng.choice(choices)()
+
+    def _object(self, depth: int) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for _ in range(self.rng.randint(0, self.config.max_children)):
+            out[self._key(out)] = self.value(depth)
+        return out
+
+    def value(self, depth: int | None = None) -> Any:
+        if depth is None:
+            depth = self.rng.randint(0, self.config.max_depth)
+        if self.rng.random() < self.config.wrap_ratio:
+            return self._wrapped(depth)
+        return self._plain(depth)
+
+    # ---------- Saves ----------
+
+    def tree(self, keys: int | None = None) -> Dict[str, Any]:
+        rng = self.rng
+        if keys is None:
+            keys = rng.randint(0, self.config.max_keys)
+
+        out: Dict[str, Any] = {}
+        if rng.random() < self.config.player_keys_ratio:
+            out["PlayersMoney"] = {"__type": "int", "value": rng.randint(0, 10**9)}
+            out["Experience"] = {"__type": "int", "value": rng.randint(0, 10**9)}
+        for _ in range(keys):
+            out[self._key(out)] = self.value()
+        return out
+
+    def encode(self, tree: Dict[str, Any], key: str, compress: bool = False) -> bytes:
+        """Encrypt ``tree`` the way the game writes it (tab indented, ``" : "`` separators).
+
+        ``compress`` gzips the text first, like ES3's compressed save setting.
+        """
+        text = json.dumps(tree, indent="\t", separators=(",", " : ")).encode("utf-8")
+        if compress:
+            text = gzip.compress(text, mtime=0)
+        salt = bytes(self.rng.getrandbits(8) for _ in range(SALT_SIZE))
+        return encrypt(text, key, salt)
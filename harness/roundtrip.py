@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import importlib.util
+import tempfile
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from pse2.analytics.commands import _export_one, _import_one, _import_target
+from pse2.analytics.rows import rebuild
+from pse2.analytics.store import open_store
+from pse2.core_es3.compression import is_compressed
+from pse2.core_es3.crypto import iter_decrypt
+from pse2.core_es3.io import ES3Backend
+from pse2.core_es3.limits import LoadLimits
+from pse2.games.base import GamePlugin
+from pse2.games.registry import get_plugin_by_id
+from pse2.harness.corpus import CorpusConfig, SaveGenerator
+from pse2.ui.edits import (
+    TEXT_TYPES,
+    apply_bool,
+    apply_text,
+    coerce_text,
+    describe_entry,
+    rewrap_entry,
+    unwrap_entry,
+)
+
+DEFAULT_BUCKETS = (100, 1_000, 10_000, 50_000)
+
+
+@dataclass
+class Failure:
+    seed: int
+    stage: str
+    detail: str
+
+
+@dataclass
+class BucketResult:
+    keys: int
+    size: int
+    # Best-of-rounds seconds per stage: load, parse, serialize, save, save_one.
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    def throughput(self, stage: str) -> float:
+        """MiB/s of encoded save processed by ``stage``."""
+        seconds = self.timings.get(stage, 0.0)
+        return self.size / (1024 * 1024) / seconds if seconds else float("inf")
+
+
+def tree_diff(expected: Any, actual: Any, path: str = "") -> str | None:
+    """Return the first path where the trees differ, or None.
+
+    Stricter than ``==``: ``1``, ``1.0`` and ``True`` are all different here,
+    and so are ``0.0`` and ``-0.0``.
+    """
+    where = path or "/"
+    if type(expected) is not type(actual):
+        return f"{where}: {type(expected).__name__} != {type(actual).__name__}"
+    if isinstance(expected, dict):
+        if list(expected) != list(actual):
+            return f"{where}: keys {list(expected)[:5]}... != {list(actual)[:5]}..."
+        for key in expected:
+            diff = tree_diff(expected[key], actual[key], f"{path}/{key}")
+            if diff:
+                return diff
+        return None
+    if isinstance(expected, list):
+        if len(expected) != len(actual):
+            return f"{where}: length {len(expected)} != {len(actual)}"
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            diff = tree_diff(a, b, f"{path}/{i}")
+            if diff:
+                return diff
+        return None
+    if isinstance(expected, float):
+        return None if repr(expected) == repr(actual) else f"{where}: {expected!r} != {actual!r}"
+    return None if expected == actual else f"{where}: {expected!r} != {actual!r}"
+
+
+def gui_apply_unchanged(raw: Dict[str, Any]) -> None:
+    """Push every Advanced-tab cell back through the GUI apply path as displayed.
+
+    Dict entries go through the child dialog's conversion, cell by cell.
+    """
+    for key, entry in list(raw.items()):
+        val, t = describe_entry(entry)
+        if t == "bool":
+            apply_bool(raw, key, val)
+        elif t in TEXT_TYPES:
+            apply_text(raw, key, t, str(val))
+        elif isinstance(entry, dict):
+            inner, outer_type = unwrap_entry(entry)
+            converted = {k: coerce_text(v, str(v)) for k, v in inner.items()}
+            raw[key] = rewrap_entry(converted, outer_type)
+
+
+def check_seed(seed: int, plugin: GamePlugin, config: CorpusConfig | None = None) -> List[Failure]:
+    """Run every round-trip property against the save generated from ``seed``."""
+    gen = SaveGenerator(seed, config)
+    tree = gen.tree()
+    key = plugin.get_es3_key()
+    failures: List[Failure] = []
+
+    def check(stage: str, expected: Any, produce) -> Any:
+        try:
+            actual = produce()
+        except Exception as exc:
+            failures.append(Failure(seed, stage, f"{type(exc).__name__}: {exc}"))
+            return None
+        diff = tree_diff(expected, actual)
+        if diff:
+            failures.append(Failure(seed, stage, diff))
+            return None
+        return actual
+
+    encoded = gen.encode(tree, key)
+    backend = ES3Backend(key=key)
+    loaded = check("backend.load", tree, lambda: backend.load_bytes(encoded))
+    if loaded is None:
+        return failures
+
+    check("backend.save", tree, lambda: ES3Backend(key=key).load_bytes(backend.save_bytes(loaded)))
+    check(
+        "plugin",
+        tree,
+        lambda: plugin.serialize_save(plugin.parse_save(copy.deepcopy(loaded))),
+    )
+
+    def gui_path() -> Dict[str, Any]:
+        structured = plugin.parse_save(copy.deepcopy(loaded))
+        gui_apply_unchanged(structured["raw"])
+        return ES3Backend(key=key).load_bytes(backend.save_bytes(plugin.serialize_save(structured)))
+
+    check("gui.apply", tree, gui_path)
+
+    def limited_path() -> Dict[str, Any]:
+        safe = ES3Backend(key=key, limits=LoadLimits())
+        safe.load_bytes(encoded)
+        m = safe.last_load_metrics
+        # Limits equal to what was measured must still admit the same save.
+        exact = LoadLimits(m.input_bytes, m.decoded_bytes, m.depth, m.keys, m.longest_string, None)
+        return ES3Backend(key=key, limits=exact).load_bytes(encoded)
+
+    check("backend.limits", tree, limited_path)
+
+    def gzip_path() -> Dict[str, Any]:
+        packed = gen.encode(tree, key, compress=True)
+        for options in ({}, {"limits": LoadLimits()}, {"incremental": True}):
+            gz = ES3Backend(key=key, **options)
+            raw = gz.load_bytes(packed)
+            diff = tree_diff(tree, raw)
+            if diff:
+                raise AssertionError(f"load {options}: {diff}")
+            packed = gz.save_bytes(raw, [])
+            if not is_compressed(next(iter_decrypt(packed, key))):
+                raise AssertionError(f"save {options} dropped compression")
+        return ES3Backend(key=key).load_bytes(packed)
+
+    check("backend.gzip", tree, gzip_path)
+
+    def store_path() -> Dict[str, Any]:
+        # Export, store, read back and import; alternate seeds use a gzipped source.
+        compress = seed % 2 == 0
+        formats = ["sqlite"] + (["parquet"] if importlib.util.find_spec("pyarrow") else [])
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            source = root / "saves" / "save.txt"
+            source.parent.mkdir()
+            source.write_bytes(gen.encode(tree, key, compress=compress))
+            meta, rows = _export_one((str(source), plugin.id, None))
+            if meta is None:
+                raise AssertionError(rows)
+            for fmt in formats:
+                path = root / f"export.{fmt}"
+                with open_store(path, fmt, "w") as store:
+                    store.write(meta, rows)
+                with open_store(path, fmt) as store:
+                    (stored,) = store.saves()
+                    stored_rows = store.rows(stored.save_id)
+                if stored.compressed != compress:
+                    raise AssertionError(f"{fmt}: stored compressed={stored.compressed}")
+                diff = tree_diff(tree, rebuild(stored_rows))
+                if diff:
+                    raise AssertionError(f"{fmt} rebuild: {diff}")
+                error = _import_one((stored, stored_rows, str(root / fmt)))
+                if error:
+                    raise AssertionError(error)
+                out = _import_target(root / fmt, stored.save_id).read_bytes()
+                if is_compressed(next(iter_decrypt(out, key))) != compress:
+                    raise AssertionError(f"{fmt} import changed compression")
+                imported = ES3Backend(key=key).load_bytes(out)
+        return imported
+
+    check("analytics.store", tree, store_path)
+
+    # Two rounds of edits so the second splice runs against the first one's output.
+    # Each round also edits one key without listing it as changed: by replacing
+    # the entry, or on odd seeds in place, which only verify_unlisted catches.
+    expected = copy.deepcopy(tree)
+    in_place = seed % 2 == 1
+
+    def incremental_path() -> Dict[str, Any]:
+        inc = ES3Backend(key=key, incremental=True, verify_unlisted=in_place)
+        raw = inc.load_bytes(encoded)
+        for _ in range(2):
+            changed = gen.rng.sample(sorted(raw), min(len(raw), gen.rng.randint(0, 3)))
+            for k in changed:
+                raw[k] = copy.deepcopy(expected[k])
+                if isinstance(raw[k], dict) and isinstance(raw[k].get("value"), str):
+                    raw[k]["value"] += gen._string()
+                    expected[k] = copy.deepcopy(raw[k])
+            unlisted = [k for k in sorted(raw) if k not in changed and isinstance(raw[k], dict)]
+            if unlisted:
+                k = gen.rng.choice(unlisted)
+                if not in_place:
+                    raw[k] = dict(raw[k])
+                raw[k]["__unlisted"] = gen._string()
+                expected[k] = copy.deepcopy(raw[k])
+            out = inc.save_bytes(raw, changed)
+        return ES3Backend(key=key).load_bytes(out)
+
+    check("backend.incremental", expected, incremental_path)
+    return failures
+
+
+def run_property(
+    cases: int,
+    seed: int = 0,
+    plugin: GamePlugin | None = None,
+    config: CorpusConfig | None = None,
+) -> List[Failure]:
+    plugin = plugin or get_plugin_by_id("phasmophobia")
+    failures: List[Failure] = []
+    for case_seed in range(seed, seed + cases):
+        failures.extend(check_seed(case_seed, plugin, config))
+    return failures
+
+
+def run_scale(
+    buckets: Sequence[int] = DEFAULT_BUCKETS,
+    seed: int = 0,
+    plugin: GamePlugin | None = None,
+    rounds: int = 3,
+) -> List[BucketResult]:
+    """Time each pipeline stage on saves of ``buckets`` top-level keys.
+
+    Every round is also checked for correctness, so a speed-up that breaks the
+    round trip fails here instead of only looking fast.
+    """
+    plugin = plugin or get_plugin_by_id("phasmophobia")
+    key = plugin.get_es3_key()
+    config = CorpusConfig(max_depth=2, max_children=4)
+    results: List[BucketResult] = []
+
+    for keys in buckets:
+        gen = SaveGenerator(seed + keys, config)
+        tree = gen.tree(keys)
+        encoded = gen.encode(tree, key)
+        result = BucketResult(keys=keys, size=len(encoded))
+
+        for _ in range(rounds):
+            backend = ES3Backend(key=key)
+            stages: Dict[str, float] = {}
+
+            start = time.perf_counter()
+            raw = backend.load_bytes(encoded)
+            stages["load"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            structured = plugin.parse_save(raw)
+            stages["parse"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            new_raw = plugin.serialize_save(structured)
+            stages["serialize"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            out = backend.save_bytes(new_raw)
+            stages["save"] = time.perf_counter() - start
+
+            diff = tree_diff(tree, ES3Backend(key=key).load_bytes(out))
+            if diff:
+                raise AssertionError(f"Round trip broke at {keys} keys: {diff}")
+
+            # One changed value through the incremental save path.
+            inc = ES3Backend(key=key, incremental=True)
+            inc_raw = inc.load_bytes(encoded)
+            start = time.perf_counter()
+            inc.save_bytes(inc_raw, [next(iter(inc_raw))])
+            stages["save_one"] = time.perf_counter() - start
+
+            for stage, seconds in stages.items():
+                result.timings[stage] = min(seconds, result.timings.get(stage, seconds))
+
+        results.append(result)
+    return results
+
+
+def run_fuzz(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="pse2 fuzz",
+        description="Round-trip synthetic ES3 saves through the backend, plugin and GUI apply path.",
+    )
+    parser.add_argument("--plugin", default="phasmophobia", help="Game plugin id (default: phasmophobia).")
+    parser.add_argument("--cases", type=int, default=200, help="Number of generated saves (default: 200).")
+    parser.add_argument("--seed", type=int, default=0, help="First seed; case N uses seed+N (default: 0).")
+    parser.add_argument("--max-keys", type=int, default=CorpusConfig.max_keys)
+    parser.add_argument("--max-depth", type=int, default=CorpusConfig.max_depth)
+    parser.add_argument("--ascii", action="store_true", help="Generate ASCII-only strings.")
+    parser.add_argument("--scale", action="store_true", help="Also record throughput per size bucket.")
+    parser.add_argument(
+        "--buckets",
+        type=lambda s: [int(x) for x in s.split(",")],
+        default=list(DEFAULT_BUCKETS),
+        help="Comma separated top-level key counts for --scale.",
+    )
+    args = parser.parse_args(argv)
+
+    plugin = get_plugin_by_id(args.plugin)
+    config = CorpusConfig(max_keys=args.max_keys, max_depth=args.max_depth, unicode=not args.ascii)
+
+    start = time.perf_counter()
+    failures = run_property(args.cases, args.seed, plugin, config)
+    elapsed = time.perf_counter() - start
+    print(f"{args.cases} cases, {len(failures)} failures in {elapsed:.2f}s")
+    for failure in failures:
+        print(f"  seed {failure.seed} [{failure.stage}] {failure.detail}")
+
+    if args.scale:
+        stages = ("load", "parse", "serialize", "save", "save_one")
+        print(f"{'keys':>8} {'bytes':>12} " + " ".join(f"{s + ' MiB/s':>16}" for s in stages))
+        for result in run_scale(args.buckets, args.seed, plugin):
+            rates = " ".join(f"{result.throughput(s):16.1f}" for s in stages)
+            print(f"{result.keys:>8} {result.size:>12} {rates}")
+
+    if failures:
+        raise SystemExit(1)
@@ -10,6 +10,22 @@ def main():
     if len(sys.argv) > 1 and sys.argv[1].lower() == "cli":
         sys.argv.pop(1)
         run_cli()
+    elif len(sys.argv) > 1 and sys.argv[1].lower() == "fuzz":
+        from pse2.harness.roundtrip import run_fuzz
+
+        run_fuzz(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1].lower() == "export":
+        from pse2.analytics.commands import run_export
+
+        run_export(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1].lower() == "import":
+        from pse2.analytics.commands import run_import
+
+        run_import(sys.argv[2:])
+    elif len(sys.argv) > 1 and sys.argv[1].lower() == "replay":
+        from pse2.session.replay import run_replay
+
+        run_replay(sys.argv[2:])
     else:
         if len(sys.argv) > 1 and sys.argv[1].lower() == "gui":
             sys.argv.pop(1)
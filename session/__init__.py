@@ -0,0 +1 @@
+__all__ = []
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import json
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+# Log format: one compact JSON object per line, appended as edits happen.
+#   {"op":"start","wall":<unix time>,"file":<save path>,"plugin":<plugin id>}
+#   {"op":"edit","t":<seconds since start>,"k":<top-level key>,"o":<old>,"n":<new>}
+#   {"op":"save","t":<seconds since start>}
+# A log may hold several sessions, each opened by its own "start" line.
+
+
+@dataclass
+class Event:
+    t: float
+    op: str
+    # Only set for "edit" events.
+    key: str | None = None
+    old: Any = None
+    new: Any = None
+
+
+@dataclass
+class Session:
+    file: str
+    plugin: str
+    wall: float
+    events: List[Event] = field(default_factory=list)
+
+
+class EditRecorder:
+    """Appends edits to a session log; every line is flushed as it is written."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._fh = path.open("a", encoding="utf-8")
+        self._t0 = time.monotonic()
+
+    def _write(self, event: Dict[str, Any]) -> None:
+        self._fh.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self._fh.flush()
+
+    def _now(self) -> float:
+        return round(time.monotonic() - self._t0, 4)
+
+    def start(self, file: Path | str, plugin: str) -> None:
+        self._t0 = time.monotonic()
+        self._write({"op": "start", "wall": time.time(), "file": str(file), "plugin": plugin})
+
+    def edit(self, key: str, old: Any, new: Any) -> None:
+        self._write({"op": "edit", "t": self._now(), "k": key, "o": old, "n": new})
+
+    def save(self) -> None:
+        self._write({"op": "save", "t": self._now()})
+
+    def close(self) -> None:
+        self._fh.close()
+
+
+def read_log(path: Path) -> List[Session]:
+    sessions: List[Session] = []
+    for lineno, event in _iter_events(path):
+        op = event.get("op")
+        if op == "start":
+            sessions.append(Session(event.get("file", ""), event.get("plugin", ""), event.get("wall", 0.0)))
+            continue
+        if not sessions:
+            raise ValueError(f"{path}:{lineno}: '{op}' before any 'start' line")
+        if op == "edit":
+            sessions[-1].events.append(Event(event["t"], op, event["k"], event.get("o"), event.get("n")))
+        elif op == "save":
+            sessions[-1].events.append(Event(event["t"], op))
+        else:
+            raise ValueError(f"{path}:{lineno}: unknown op '{op}'")
+    return sessions
+
+
+def _iter_events(path: Path) -> Iterator[tuple[int, Dict[str, Any]]]:
+    with path.open("r", encoding="utf-8") as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield lineno, json.loads(line)
+            except ValueError:
+                # A crash can leave a torn last line; everything before it is usable.
+                return
@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from pse2.core_es3.io import ES3Backend
+from pse2.games.registry import detect_plugin, get_plugin_by_id
+from pse2.session.log import Event, Session, read_log
+from pse2.ui.edits import TEXT_TYPES, apply_bool, apply_text, describe_entry, replaced_keys
+
+# Timed operations, in pipeline order.
+OPS = ("load", "apply", "serialize", "save")
+
+_Timings = Dict[str, List[float]]
+
+
+@dataclass
+class LatencyStats:
+    op: str
+    count: int
+    mean: float
+    p50: float
+    p95: float
+    max: float
+
+    @classmethod
+    def from_samples(cls, op: str, samples: List[float]) -> "LatencyStats":
+        if not samples:
+            return cls(op, 0, 0.0, 0.0, 0.0, 0.0)
+        ordered = sorted(samples)
+
+        def pct(q: float) -> float:
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+        return cls(op, len(ordered), sum(ordered) / len(ordered), pct(0.5), pct(0.95), ordered[-1])
+
+
+def apply_edit(raw: Dict[str, Any], event: Event) -> None:
+    """Re-apply a recorded edit through the same code path the GUI used for it.
+
+    Primitive edits go through the Advanced tab conversions (text or toggle);
+    anything else (child dialog, type changes, new keys) replaces the entry.
+    """
+    key = event.key
+    new_val, new_t = describe_entry(event.new)
+    _, cur_t = describe_entry(raw.get(key))
+    if new_t == cur_t == "bool":
+        apply_bool(raw, key, new_val)
+    elif new_t == cur_t and new_t in TEXT_TYPES:
+        apply_text(raw, key, new_t, str(new_val))
+    else:
+        raw[key] = copy.deepcopy(event.new)
+
+
+def replay_session(
+    session: Session,
+    target: Path,
+    paced: bool = False,
+    speed: float = 1.0,
+    plugin_id: str | None = None,
+) -> _Timings:
+    """Replay ``session`` against the save at ``target`` (which is modified in place)."""
+    plugin_id = plugin_id or session.plugin
+    plugin = get_plugin_by_id(plugin_id) if plugin_id else detect_plugin(target)
+    if plugin is None:
+        raise ValueError(f"No game plugin can decrypt: {target}")
+
+    timings: _Timings = {op: [] for op in OPS}
+    backend = ES3Backend(key=plugin.get_es3_key(), incremental=True)
+
+    start = time.perf_counter()
+    raw = backend.load_from_file(target)
+    timings["load"].append(time.perf_counter() - start)
+
+    changed: set[str] = set()
+    session_start = time.perf_counter()
+    for event in session.events:
+        if paced:
+            delay = event.t / speed - (time.perf_counter() - session_start)
+            if delay > 0:
+                time.sleep(delay)
+
+        start = time.perf_counter()
+        if event.op == "edit":
+            apply_edit(raw, event)
+            changed.add(event.key)
+            timings["apply"].append(time.perf_counter() - start)
+            continue
+
+        new_raw = plugin.serialize_save(plugin.parse_save(raw))
+        mid = time.perf_counter()
+        backend.save_to_file(target, new_raw, changed=changed | replaced_keys(raw, new_raw))
+        timings["save"].append(time.perf_counter() - mid)
+        timings["serialize"].append(mid - start)
+        changed = set()
+
+    return timings
+
+
+def _replay_task(task: Tuple[Session, str, bool, float, str | None]) -> _Timings | str:
+    session, target, paced, speed, plugin_id = task
+    try:
+        return replay_session(session, Path(target), paced, speed, plugin_id)
+    except Exception as exc:
+        return f"{target}: {exc}"
+
+
+def run_replay(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="pse2 replay",
+        description="Re-apply recorded editing sessions against saves and report per-operation latency.",
+    )
+    parser.add_argument("log", help="Session log written with --record.")
+    parser.add_argument(
+        "saves",
+        nargs="*",
+        help="Saves to replay against (default: the file each session was recorded on).",
+    )
+    parser.add_argument("--paced", action="store_true", help="Keep the recorded delays between edits.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pace multiplier for --paced (default: 1.0).")
+    parser.add_argument("--repeat", type=int, default=1, help="Replay every session/save pair N times.")
+    parser.add_argument("--jobs", type=int, default=1, help="Replays to run in parallel processes (default: 1).")
+    parser.add_argument("--plugin", help="Game plugin id (default: the one recorded in the log).")
+    parser.add_argument("--out", help="Work directory for the save copies (default: a temporary one).")
+    args = parser.parse_args(argv)
+
+    sessions = read_log(Path(args.log))
+    if not sessions:
+        raise SystemExit(f"No sessions recorded in {args.log}")
+
+    work = Path(args.out) if args.out else Path(tempfile.mkdtemp(prefix="pse2-replay-"))
+    work.mkdir(parents=True, exist_ok=True)
+
+    # Every replay edits its own copy so originals are never touched.
+    tasks = []
+    for i, session in enumerate(sessions):
+        sources = [Path(s) for s in args.saves] or [Path(session.file)]
+        for j, source in enumerate(sources):
+            for n in range(args.repeat):
+                target = work / f"{i}-{j}-{n}-{source.name}"
+                shutil.copyfile(source, target)
+                tasks.append((session, str(target), args.paced, args.speed, args.plugin))
+
+    start = time.perf_counter()
+    if args.jobs > 1:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            results = list(pool.map(_replay_task, tasks))
+    else:
+        results = [_replay_task(task) for task in tasks]
+    elapsed = time.perf_counter() - start
+
+    merged: _Timings = {op: [] for op in OPS}
+    errors = [r for r in results if isinstance(r, str)]
+    for result in results:
+        if not isinstance(result, str):
+            for op, samples in result.items():
+                merged[op].extend(samples)
+
+    print(f"Replayed {len(tasks) - len(errors)}/{len(tasks)} sessions in {elapsed:.2f}s")
+    print(f"{'op':<10} {'count':>7} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}")
+    for op in OPS:
+        s = LatencyStats.from_samples(op, merged[op])
+        print(f"{op:<10} {s.count:>7} {s.mean * 1e3:9.3f} {s.p50 * 1e3:9.3f} {s.p95 * 1e3:9.3f} {s.max * 1e3:9.3f}")
+    for error in errors:
+        print(f"  failed {error}")
+
+    if not args.out:
+        shutil.rmtree(work, ignore_errors=True)
+    if errors:
+        raise SystemExit(1)
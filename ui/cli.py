@@ -4,8 +4,10 @@ import argparse
 from pathlib import Path
 
 from pse2.core_es3.io import ES3Backend
-from pse2.games.registry import get_plugin_by_id, get_all_plugins
+from pse2.games.registry import detect_plugin, get_plugin_by_id, get_all_plugins
 from pse2.models.phasmo import PlayerStats
+from pse2.session.log import EditRecorder
+from pse2.ui.edits import replaced_keys
 
 
 def run_cli() -> None:
@@ -16,7 +18,10 @@ def run_cli() -> None:
         "game",
         nargs="?",
         default="phasmophobia",
-        help="Game plugin id (default: phasmophobia, or 'list' to list plugins)",
+        help=(
+            "Game plugin id (default: phasmophobia, 'auto' to detect it from --file, "
+            "or 'list' to list plugins)"
+        ),
     )
     parser.add_argument(
         "--file",
@@ -33,6 +38,11 @@ def run_cli() -> None:
         type=int,
         help="Set player experience (XP) to this value.",
     )
+    parser.add_argument(
+        "--record",
+        type=str,
+        help="Append the edits made by this run to a session log (see 'pse2 replay').",
+    )
 
     args = parser.parse_args()
 
@@ -42,7 +52,15 @@ def run_cli() -> None:
             print(f"  {plugin.id} - {plugin.name}")
         return
 
-    plugin = get_plugin_by_id(args.game)
+    if args.game == "auto":
+        if not args.file:
+            raise SystemExit("'auto' needs --file to detect the game from.")
+        plugin = detect_plugin(Path(args.file))
+        if plugin is None:
+            raise SystemExit(f"No game plugin can decrypt: {args.file}")
+        print(f"Detected game: {plugin.name}")
+    else:
+        plugin = get_plugin_by_id(args.game)
     key = plugin.get_es3_key()
 
     if args.file:
@@ -53,7 +71,11 @@ def run_cli() -> None:
             raise SystemExit("No default locations defined for this game.")
         save_path = default_locations[0].path
 
-    backend = ES3Backend(key=key)
+    backend = ES3Backend(key=key, incremental=True)
+
+    recorder = EditRecorder(Path(args.record)) if args.record else None
+    if recorder:
+        recorder.start(save_path, plugin.id)
 
     print(f"Loading save from: {save_path}")
     raw = backend.load_from_file(save_path)
@@ -77,7 +99,15 @@ def run_cli() -> None:
     if changed:
         structured["player"] = player
         new_raw = plugin.serialize_save(structured)
-        backend.save_to_file(save_path, new_raw)
+        changed_keys = replaced_keys(raw, new_raw)
+        if recorder:
+            for name in changed_keys:
+                if raw.get(name) != new_raw[name]:
+                    recorder.edit(name, raw.get(name), new_raw[name])
+
+        backend.save_to_file(save_path, new_raw, changed=changed_keys)
         print("Save updated (backup created in the save directory).")
+        if recorder:
+            recorder.save()
     else:
         print("No changes requested; save not modified.")
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Set, Tuple
+
+# Display types the Advanced tab edits inline as text.
+TEXT_TYPES = ("int", "float", "string")
+
+
+def describe_entry(entry: Any) -> Tuple[Any, str]:
+    """Return ``(value, display type)`` for a top-level save entry.
+
+    ES3 wraps most values as ``{"__type": ..., "value": ...}``; primitives are
+    shown by their Python type, anything else by its ES3 type name.
+    """
+    if isinstance(entry, dict) and "value" in entry:
+        val = entry["value"]
+        t = str(entry.get("__type", type(val).__name__))
+    else:
+        val = entry
+        t = type(val).__name__
+
+    if isinstance(val, bool):
+        return val, "bool"
+    if isinstance(val, int):
+        return val, "int"
+    if isinstance(val, float):
+        return val, "float"
+    if isinstance(val, str):
+        return val, "string"
+    return val, t
+
+
+def replaced_keys(raw: Dict[str, Any], new_raw: Dict[str, Any]) -> Set[str]:
+    """Top-level keys whose entry ``serialize_save`` replaced or added.
+
+    Compared by identity, so this works for any plugin without knowing which
+    keys it writes; in-place edits to ``raw`` must be tracked separately.
+    """
+    return {k for k, v in new_raw.items() if v is not raw.get(k)}
+
+
+def is_primitive(value: Any) -> bool:
+    """True for values edited as text; containers and null are not."""
+    return isinstance(value, (bool, int, float, str))
+
+
+def coerce_text(original: Any, text: str) -> Any:
+    """Parse ``text`` back into the type of ``original``.
+
+    Returns ``original`` unchanged when the text does not parse as that type
+    (or is NaN/infinite for a float) and for non-primitive values.
+    """
+    if isinstance(original, bool):
+        return text.strip().lower() in ("true", "1")
+    if isinstance(original, int):
+        try:
+            return int(text)
+        except ValueError:
+            return original
+    if isinstance(original, float):
+        try:
+            value = float(text)
+        except ValueError:
+            return original
+        return value if math.isfinite(value) else original
+    if isinstance(original, str):
+        return text
+    return original
+
+
+def unwrap_entry(entry: Dict[str, Any]) -> Tuple[Dict[str, Any], str | None]:
+    """Split a dict entry into the mapping the child dialog edits and its ES3 type.
+
+    A ``{"__type": ..., "value": {...}}`` wrapper yields a copy of its value
+    and the ``__type``; any other dict yields a copy of itself and ``None``.
+    """
+    if "__type" in entry and "value" in entry and isinstance(entry["value"], dict):
+        return dict(entry["value"]), entry["__type"]
+    return dict(entry), None
+
+
+def rewrap_entry(inner: Dict[str, Any], outer_type: str | None) -> Dict[str, Any]:
+    """Inverse of :func:`unwrap_entry`."""
+    if outer_type is None:
+        return inner
+    return {"__type": outer_type, "value": inner}
+
+
+def _store(raw: Dict[str, Any], key: str, value: Any) -> bool:
+    entry = raw.get(key)
+    wrapped = isinstance(entry, dict) and "value" in entry
+    old = entry["value"] if wrapped else entry
+    if type(old) is type(value) and old == value:
+        return False
+
+    if wrapped:
+        entry["value"] = value
+        raw[key] = entry
+    else:
+        raw[key] = value
+    return True
+
+
+def apply_bool(raw: Dict[str, Any], key: str, value: bool) -> bool:
+    """Store ``value`` under ``key``; returns True if that changed the save."""
+    return _store(raw, key, value)
+
+
+def apply_text(raw: Dict[str, Any], key: str, t: str, text: str) -> bool:
+    """Parse ``text`` as display type ``t`` and store it under ``key``.
+
+    Returns True if that changed the save, False if the value was the same or
+    the text does not parse (``raw`` is then left untouched). NaN and infinities
+    count as unparsable: JSON cannot hold them.
+    """
+    if t == "int":
+        try:
+            value: Any = int(text)
+        except ValueError:
+            return False
+    elif t == "float":
+        try:
+            value = float(text)
+        except ValueError:
+            return False
+        if not math.isfinite(value):
+            return False
+    else:
+        value = text
+
+    return _store(raw, key, value)
@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import sys
 import os
+import argparse
+import copy
 
 
 
@@ -29,8 +31,20 @@ from PySide6.QtWidgets import (
 )
 
 from pse2.core_es3.io import ES3Backend
-from pse2.games.registry import get_all_plugins
+from pse2.games.registry import detect_plugin, get_all_plugins
 from pse2.models.phasmo import PlayerStats
+from pse2.session.log import EditRecorder
+from pse2.ui.edits import (
+    TEXT_TYPES,
+    apply_bool,
+    apply_text,
+    coerce_text,
+    describe_entry,
+    is_primitive,
+    replaced_keys,
+    rewrap_entry,
+    unwrap_entry,
+)
 
 def resource_path(relative: str) -> Path:
     if hasattr(sys, "_MEIPASS"):
@@ -47,20 +61,7 @@ class DictEditorDialog(QDialog):
         self.setWindowTitle("Edit value")
         self.resize(400, 300)
 
-        # Determine mode
-        if (
-            isinstance(data, dict)
-            and "__type" in data
-            and "value" in data
-            and isinstance(data["value"], dict)
-        ):
-            self._mode = "wrapped"
-            self._outer_type = data["__type"]
-            self._inner = dict(data["value"])
-        else:
-            self._mode = "plain"
-            self._outer_type = None
-            self._inner = dict(data)
+        self._inner, self._outer_type = unwrap_entry(data)
 
         layout = QVBoxLayout(self)
 
@@ -92,7 +93,11 @@ class DictEditorDialog(QDialog):
             self.table.setItem(row, 0, key_item)
 
             value_item = QTableWidgetItem(str(val))
-            value_item.setFlags(value_item.flags() | Qt.ItemIsEditable)
+            if is_primitive(val):
+                value_item.setFlags(value_item.flags() | Qt.ItemIsEditable)
+            else:
+                # Nested containers and nulls are shown but not edited as text.
+                value_item.setFlags(value_item.flags() & ~Qt.ItemIsEditable)
             self.table.setItem(row, 1, value_item)
 
     def _apply_changes(self):
@@ -105,13 +110,9 @@ class DictEditorDialog(QDialog):
                 continue
 
             key = key_item.text()
-            text = value_item.text()
-            try:
-                val = float(text)
-            except ValueError:
-                val = text
-
-            updated[key] = val
+            # Every value keeps its original type; the save is validated
+            # against the original types before it is written.
+            updated[key] = coerce_text(self._inner.get(key), value_item.text())
 
         self._inner = updated
 
@@ -120,16 +121,11 @@ class DictEditorDialog(QDialog):
         super().accept()
 
     def get_result(self) -> Dict[str, Any]:
-        if self._mode == "wrapped":
-            return {
-                "__type": self._outer_type,
-                "value": self._inner,
-            }
-        return self._inner
+        return rewrap_entry(self._inner, self._outer_type)
 
 
 class MainWindow(QWidget):
-    def __init__(self):
+    def __init__(self, record_path: Path | None = None):
         super().__init__()
 
         icon_path = resource_path("pse2/ui/pse2_icon.ico")
@@ -145,6 +141,10 @@ class MainWindow(QWidget):
         self.backend: ES3Backend | None = None
         self.save_path: Path | None = None
         self.structured: Dict[str, Any] | None = None
+        # Top-level keys edited since the last load/save, for incremental saves.
+        self.changed_keys: set[str] = set()
+        # Optional session log of every edit, for 'pse2 replay'.
+        self.recorder = EditRecorder(record_path) if record_path else None
 
         self._build_ui()
 
@@ -199,6 +199,7 @@ class MainWindow(QWidget):
         money_row.addWidget(money_label)
 
         self.money_edit = QLineEdit()
+        self.money_edit.editingFinished.connect(self.on_money_edited)
         money_row.addWidget(self.money_edit)
         basic_layout.addLayout(money_row)
 
@@ -209,6 +210,7 @@ class MainWindow(QWidget):
         xp_row.addWidget(xp_label)
 
         self.xp_edit = QLineEdit()
+        self.xp_edit.editingFinished.connect(self.on_xp_edited)
         xp_row.addWidget(self.xp_edit)
         basic_layout.addLayout(xp_row)
 
@@ -236,6 +238,7 @@ class MainWindow(QWidget):
         self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.table.setSelectionBehavior(QAbstractItemView.SelectItems)
         self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.itemChanged.connect(self.on_advanced_item_changed)
 
         adv_layout.addWidget(self.table)
         self.tabs.addTab(self.advanced_tab, "Advanced")
@@ -248,6 +251,11 @@ class MainWindow(QWidget):
             return locs[0].path
         return None
 
+    def _mark_changed(self, key: str, old: Any, new: Any):
+        self.changed_keys.add(key)
+        if self.recorder:
+            self.recorder.edit(key, old, new)
+
     def _show_error(self, title: str, text: str):
         QMessageBox.critical(self, title, text)
 
@@ -290,8 +298,15 @@ class MainWindow(QWidget):
             self._show_error("Error", f"Save file not found:\n{path}")
             return
 
+        detected = detect_plugin(path)
+        if detected is not None:
+            self.plugin = detected
+
         self.save_path = path
-        self.backend = ES3Backend(key=self.plugin.get_es3_key())
+        self.backend = ES3Backend(key=self.plugin.get_es3_key(), incremental=True)
+        self.changed_keys = set()
+        if self.recorder:
+            self.recorder.start(path, self.plugin.id)
 
         try:
             raw = self.backend.load_from_file(path)
@@ -307,42 +322,66 @@ class MainWindow(QWidget):
             self._show_error("Error", "No save loaded.")
             return
 
-        player: PlayerStats = self.structured["player"]
-
-
-        if player.money is not None:
-            money_text = self.money_edit.text().strip()
-            if money_text.upper() != "ERROR" and money_text != "":
-                try:
-                    player.money = int(money_text)
-                except ValueError:
-                    self._show_error("Error", "Money must be an integer.")
-                    return
-
-
-        if player.experience is not None:
-            xp_text = self.xp_edit.text().strip()
-            if xp_text.upper() != "ERROR" and xp_text != "":
-                try:
-                    player.experience = int(xp_text)
-                except ValueError:
-                    self._show_error("Error", "Experience must be an integer.")
-                    return
-
-        self.structured["player"] = player
-
-
+        # Edits are normally applied (and recorded) as they happen; this only
+        # catches a field that is still being edited.
+        if not self._apply_basic_field(self.money_edit, "money", "Money", report=True):
+            return
+        if not self._apply_basic_field(self.xp_edit, "experience", "Experience", report=True):
+            return
         self._apply_advanced_changes()
 
+        raw = self.structured.get("raw", {})
         try:
             new_raw = self.plugin.serialize_save(self.structured)
-            self.backend.save_to_file(self.save_path, new_raw)
+            changed = self.changed_keys | replaced_keys(raw, new_raw)
+            self.backend.save_to_file(self.save_path, new_raw, changed=changed)
+            self.changed_keys = set()
+            # What was just written is the base the next edits are compared with.
+            self.structured["raw"] = new_raw
+            self._populate_advanced_table()
+            if self.recorder:
+                self.recorder.save()
             self._show_info("Saved", "Save updated (backup created).")
         except Exception as exc:
             self._show_error("Error", f"Failed to save:\n{exc}")
 
     # ---------- Basic tab helpers ----------
 
+    def _apply_basic_field(self, edit: QLineEdit, attr: str, label: str, report: bool = False) -> bool:
+        """Copy a Basic-tab field into the player and record it if it changed.
+
+        Returns False if the text is not an integer (shown as an error when
+        ``report`` is set); empty and ERROR fields are left alone.
+        """
+        if not self.structured:
+            return True
+        player: PlayerStats = self.structured["player"]
+        current = getattr(player, attr)
+        text = edit.text().strip()
+        if current is None or text.upper() == "ERROR" or text == "":
+            return True
+        try:
+            value = int(text)
+        except ValueError:
+            if report:
+                self._show_error("Error", f"{label} must be an integer.")
+            return False
+        if value == current:
+            return True
+
+        before = player.to_raw()
+        setattr(player, attr, value)
+        for key, new_entry in player.to_raw().items():
+            if before.get(key) != new_entry:
+                self._mark_changed(key, before.get(key), new_entry)
+        return True
+
+    def on_money_edited(self):
+        self._apply_basic_field(self.money_edit, "money", "Money")
+
+    def on_xp_edited(self):
+        self._apply_basic_field(self.xp_edit, "experience", "Experience")
+
     def _populate_basic_fields(self):
         player: PlayerStats = self.structured["player"]
         messages: list[str] = []
@@ -373,6 +412,14 @@ class MainWindow(QWidget):
     # ---------- Advanced tab helpers ----------
 
     def _populate_advanced_table(self):
+        # Filling the table must not look like user edits to itemChanged.
+        self.table.blockSignals(True)
+        try:
+            self._fill_advanced_table()
+        finally:
+            self.table.blockSignals(False)
+
+    def _fill_advanced_table(self):
         self.table.setRowCount(0)
         if not self.structured:
             return
@@ -388,23 +435,7 @@ class MainWindow(QWidget):
             self.table.setItem(row, 0, key_item)
 
 
-            if isinstance(entry, dict) and "value" in entry:
-                val = entry["value"]
-                t = str(entry.get("__type", type(val).__name__))
-            else:
-                val = entry
-                t = type(val).__name__
-
-            if isinstance(val, bool):
-                t_display = "bool"
-            elif isinstance(val, int):
-                t_display = "int"
-            elif isinstance(val, float):
-                t_display = "float"
-            elif isinstance(val, str):
-                t_display = "string"
-            else:
-                t_display = t
+            val, t_display = describe_entry(entry)
 
 
             type_item = QTableWidgetItem(t_display)
@@ -417,12 +448,10 @@ class MainWindow(QWidget):
                 btn.setCheckable(True)
                 btn.setChecked(bool(val))
                 btn.setText("True" if btn.isChecked() else "False")
-                btn.clicked.connect(
-                    lambda checked, b=btn: b.setText("True" if checked else "False")
-                )
                 btn.setProperty("pse2_key", str(key))
+                btn.clicked.connect(self.on_bool_toggled)
                 self.table.setCellWidget(row, 2, btn)
-            elif t_display in ("int", "float", "string"):
+            elif t_display in TEXT_TYPES:
                 value_item = QTableWidgetItem(str(val))
                 value_item.setFlags(value_item.flags() | Qt.ItemIsEditable)
                 self.table.setItem(row, 2, value_item)
@@ -432,6 +461,37 @@ class MainWindow(QWidget):
                 btn.clicked.connect(self.on_edit_complex_value_clicked)
                 self.table.setCellWidget(row, 2, btn)
 
+    def on_bool_toggled(self, checked: bool):
+        btn = self.sender()
+        if not isinstance(btn, QPushButton) or not self.structured:
+            return
+        btn.setText("True" if checked else "False")
+        key = btn.property("pse2_key")
+        raw = self.structured.get("raw", {})
+        old = copy.deepcopy(raw.get(key)) if self.recorder else None
+        if apply_bool(raw, key, checked):
+            self._mark_changed(key, old, raw[key])
+
+    def on_advanced_item_changed(self, item: QTableWidgetItem):
+        if item.column() != 2 or not self.structured:
+            return
+        key_item = self.table.item(item.row(), 0)
+        type_item = self.table.item(item.row(), 1)
+        if not key_item or not type_item:
+            return
+        key = key_item.text()
+        raw = self.structured.get("raw", {})
+        old = copy.deepcopy(raw.get(key)) if self.recorder else None
+        if apply_text(raw, key, type_item.text(), item.text()):
+            self._mark_changed(key, old, raw[key])
+
+        # Show what is stored now; unparsable input reverts to the current value.
+        shown = str(describe_entry(raw.get(key))[0])
+        if item.text() != shown:
+            self.table.blockSignals(True)
+            item.setText(shown)
+            self.table.blockSignals(False)
+
     def on_edit_complex_value_clicked(self):
         if not self.structured:
             return
@@ -452,8 +512,12 @@ class MainWindow(QWidget):
         dlg = DictEditorDialog(entry, self)
         if dlg.exec() == QDialog.Accepted:
             new_entry = dlg.get_result()
+            if new_entry == entry:
+                # OK without edits: keep the entry as is and record nothing.
+                return
             raw[key] = new_entry
             self.structured["raw"] = raw
+            self._mark_changed(key, entry, new_entry)
 
     def _apply_advanced_changes(self):
         if not self.structured:
@@ -468,56 +532,25 @@ class MainWindow(QWidget):
 
             key = key_item.text()
             t = type_item.text()
-            entry = raw.get(key)
-
+            old = copy.deepcopy(raw.get(key)) if self.recorder else None
 
             if t == "bool":
                 btn = self.table.cellWidget(row, 2)
                 if isinstance(btn, QPushButton):
-                    val_bool = btn.isChecked()
-                    if isinstance(entry, dict) and "value" in entry:
-                        entry["value"] = val_bool
-                        raw[key] = entry
-                    else:
-                        raw[key] = val_bool
+                    if apply_bool(raw, key, btn.isChecked()):
+                        self._mark_changed(key, old, raw[key])
                 continue
 
             cell_widget = self.table.cellWidget(row, 2)
-            if cell_widget is not None and t != "bool":
+            if cell_widget is not None:
                 continue
 
             value_item = self.table.item(row, 2)
             if not value_item:
                 continue
-            text = value_item.text()
-
-            if isinstance(entry, dict) and "value" in entry:
-                if t == "int":
-                    try:
-                        entry["value"] = int(text)
-                    except ValueError:
-                        continue
-                elif t == "float":
-                    try:
-                        entry["value"] = float(text)
-                    except ValueError:
-                        continue
-                else:
-                    entry["value"] = text
-                raw[key] = entry
-            else:
-                if t == "int":
-                    try:
-                        raw[key] = int(text)
-                    except ValueError:
-                        continue
-                elif t == "float":
-                    try:
-                        raw[key] = float(text)
-                    except ValueError:
-                        continue
-                else:
-                    raw[key] = text
+
+            if apply_text(raw, key, t, value_item.text()):
+                self._mark_changed(key, old, raw[key])
 
         self.structured["raw"] = raw
 
@@ -526,7 +559,11 @@ def run_qt():
     import sys
     from pathlib import Path
 
-    app = QApplication(sys.argv)
+    parser = argparse.ArgumentParser(prog="pse2 gui", add_help=False)
+    parser.add_argument("--record", type=Path)
+    args, qt_args = parser.parse_known_args(sys.argv[1:])
+
+    app = QApplication(sys.argv[:1] + qt_args)
 
     qss_path = Path(__file__).with_name("theme_dark.qss")
     if qss_path.is_file():
@@ -536,6 +573,6 @@ def run_qt():
     if icon_path.is_file():
         app.setWindowIcon(QIcon(str(icon_path)))
 
-    window = MainWindow()
+    window = MainWindow(record_path=args.record)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file